@@ -7,7 +7,6 @@ from aws_cdk import (
     Duration,
     RemovalPolicy,
     CfnOutput,
-    BundlingOptions,
     aws_s3 as s3,
     aws_lambda as lambda_,
     aws_ec2 as ec2,
@@ -15,14 +14,17 @@ from aws_cdk import (
     aws_iam as iam,
     aws_apigateway as apigw,
     aws_s3_notifications as s3n,
+    aws_sqs as sqs,
+    aws_lambda_event_sources as lambda_event_sources,
     aws_cloudwatch as cloudwatch,
     aws_wafv2 as wafv2,
     aws_kms as kms,
     aws_cognito as cognito,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
 )
 from constructs import Construct
-import random
-import string
+import hashlib
 
 
 class TakcStack(Stack):
@@ -35,8 +37,10 @@ class TakcStack(Stack):
         bedrock_model_id = self.node.try_get_context("bedrock_model_id") or \
             "anthropic.claude-3-haiku-20240307-v1:0"
         
-        # Generate unique suffix
-        name_suffix = ''.join(random.choices(string.hexdigits.lower(), k=8))
+        # Stable per account/region/environment so repeated synths produce identical templates
+        name_suffix = hashlib.sha1(
+            f"{self.account}-{self.region}-{environment}".encode()
+        ).hexdigest()[:8]
         
         # Common tags
         tags = {
@@ -46,7 +50,19 @@ class TakcStack(Stack):
         }
         
         # Use default VPC (simpler for reference implementation)
-        vpc = ec2.Vpc.from_lookup(self, "DefaultVpc", is_default=True)
+        # Explicit vpc_id/subnet_ids/availability_zones context skips the EC2 lookup at synth time
+        vpc_id = self.node.try_get_context("vpc_id")
+        context_subnet_ids = self.node.try_get_context("subnet_ids")
+        availability_zones = self.node.try_get_context("availability_zones")
+        if vpc_id and context_subnet_ids and availability_zones:
+            vpc = ec2.Vpc.from_vpc_attributes(
+                self, "DefaultVpc",
+                vpc_id=vpc_id,
+                availability_zones=availability_zones,
+                public_subnet_ids=context_subnet_ids
+            )
+        else:
+            vpc = ec2.Vpc.from_lookup(self, "DefaultVpc", is_default=True)
         
         # KMS Key for S3 bucket encryption
         kms_key = kms.Key(
@@ -130,7 +146,7 @@ class TakcStack(Stack):
             ]
         )
         
-        # Add permissions for S3, Bedrock, and Lambda invocation
+        # Add permissions for S3 and Bedrock
         lambda_role.add_to_policy(iam.PolicyStatement(
             effect=iam.Effect.ALLOW,
             actions=[
@@ -140,24 +156,25 @@ class TakcStack(Stack):
             ],
             resources=[
                 data_bucket.bucket_arn,
-                f"{data_bucket.bucket_arn}/*"
+                data_bucket.arn_for_objects("*")
             ]
         ))
         
+        # Scope Bedrock access to the configured model. Cross-region inference profile IDs
+        # (e.g. "us.anthropic...") route to the base model in any region of the profile.
+        model_prefix, _, base_model_id = bedrock_model_id.partition(".")
+        if model_prefix not in ("us", "eu", "apac", "global"):
+            base_model_id = bedrock_model_id
         lambda_role.add_to_policy(iam.PolicyStatement(
             effect=iam.Effect.ALLOW,
             actions=[
                 "bedrock:InvokeModel",
                 "bedrock:InvokeModelWithResponseStream"
             ],
-            resources=["*"]
-        ))
-        
-        # Add Lambda invoke permission (wildcard to avoid circular dependency)
-        lambda_role.add_to_policy(iam.PolicyStatement(
-            effect=iam.Effect.ALLOW,
-            actions=["lambda:InvokeFunction"],
-            resources=[f"arn:aws:lambda:{self.region}:{self.account}:function:takc-compression-processor-{name_suffix}"]
+            resources=[
+                f"arn:aws:bedrock:*::foundation-model/{base_model_id}",
+                f"arn:aws:bedrock:{self.region}:{self.account}:inference-profile/*"
+            ]
         ))
         
         # Grant Lambda role permission to use KMS key for S3 encryption/decryption
@@ -172,87 +189,96 @@ class TakcStack(Stack):
             "AWS_ACCOUNT_ID": self.account
         }
         
-        # Compression Processor Lambda (no VPC for simplicity in reference implementation)
-        compression_lambda = lambda_.Function(
-            self, "TakcCompressionProcessor",
-            function_name=f"takc-compression-processor-{name_suffix}",
-            runtime=lambda_.Runtime.PYTHON_3_9,
-            handler="bedrock_compression_service.lambda_handler",
-            code=lambda_.Code.from_asset(
-                "../src",
-                bundling=BundlingOptions(
-                    image=lambda_.Runtime.PYTHON_3_9.bundling_image,
-                    command=[
-                        "bash", "-c",
-                        "pip install -r requirements.txt -t /asset-output && "
-                        "cp bedrock_compression_service.py compression_service.py /asset-output/"
-                    ]
-                )
-            ),
-            role=lambda_role,
-            timeout=Duration.minutes(15),
-            memory_size=2048,
-            environment=common_env
+        # Lambda assets are pre-built once by scripts/build.sh via the cdk.json
+        # "build" hook: dependencies go into one shared layer, handlers into one code asset
+        deps_layer = lambda_.LayerVersion(
+            self, "TakcDepsLayer",
+            code=lambda_.Code.from_asset("../dist/lambda_layer"),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_12],
+            compatible_architectures=[lambda_.Architecture.ARM_64],
+            description="Shared Python dependencies for TAKC Lambda functions"
         )
+        lambda_code = lambda_.Code.from_asset("../dist/lambda_fn")
         
         # Data Processor Lambda (no VPC for simplicity in reference implementation)
-        data_processor_env = common_env.copy()
-        data_processor_env["COMPRESSION_LAMBDA_NAME"] = compression_lambda.function_name
-        
+        # Handles S3 uploads end to end: chunking and Bedrock compression run in-process
         data_processor_lambda = lambda_.Function(
             self, "TakcDataProcessor",
             function_name=f"takc-data-processor-{name_suffix}",
-            runtime=lambda_.Runtime.PYTHON_3_9,
-            handler="data_processor.lambda_handler",
-            code=lambda_.Code.from_asset(
-                "../src",
-                bundling=BundlingOptions(
-                    image=lambda_.Runtime.PYTHON_3_9.bundling_image,
-                    command=[
-                        "bash", "-c",
-                        "pip install -r requirements.txt -t /asset-output && "
-                        "cp data_processor.py compression_service.py /asset-output/"
-                    ]
-                )
-            ),
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
+            handler="unified_handler.lambda_handler",
+            code=lambda_code,
+            layers=[deps_layer],
             role=lambda_role,
             timeout=Duration.minutes(
-                self.node.try_get_context("lambda_timeout_data_processor") or 5
+                self.node.try_get_context("lambda_timeout_data_processor") or 15
+            ),
+            memory_size=self.node.try_get_context("lambda_memory_data_processor") or 2048,
+            environment=common_env
+        )
+        
+        # S3 Event Notifications are buffered in SQS so bulk uploads reach the data processor in
+        # batches, with retries and a dead-letter queue for files that keep failing
+        ingest_dlq = sqs.Queue(
+            self, "TakcIngestDLQ",
+            queue_name=f"takc-ingest-dlq-{name_suffix}",
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            retention_period=Duration.days(14)
+        )
+        ingest_queue = sqs.Queue(
+            self, "TakcIngestQueue",
+            queue_name=f"takc-ingest-{name_suffix}",
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            # AWS recommends at least 6x the function timeout for SQS event sources
+            visibility_timeout=Duration.minutes(
+                6 * (self.node.try_get_context("lambda_timeout_data_processor") or 15)
             ),
-            memory_size=self.node.try_get_context("lambda_memory_data_processor") or 512,
-            environment=data_processor_env
+            dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=3, queue=ingest_dlq)
         )
         
-        # S3 Event Notification to trigger data processor
         data_bucket.add_event_notification(
             s3.EventType.OBJECT_CREATED,
-            s3n.LambdaDestination(data_processor_lambda),
+            s3n.SqsDestination(ingest_queue),
             s3.NotificationKeyFilter(prefix="raw-data/", suffix=".txt")
         )
+        data_processor_lambda.add_event_source(lambda_event_sources.SqsEventSource(
+            ingest_queue,
+            batch_size=10,
+            max_batching_window=Duration.seconds(5)
+        ))
+        
+        # Keep query processor instances initialized to avoid cold starts on the API path.
+        # Provisioned concurrency and SnapStart are mutually exclusive, so SnapStart covers
+        # cold starts when provisioned concurrency is set to 0.
+        query_provisioned_concurrency = self.node.try_get_context("query_provisioned_concurrency")
+        query_provisioned_concurrency = 2 if query_provisioned_concurrency is None else int(query_provisioned_concurrency)
         
         # Query Processor Lambda (no VPC for simplicity in reference implementation)
         query_lambda = lambda_.Function(
             self, "TakcQueryProcessor",
             function_name=f"takc-query-processor-{name_suffix}",
-            runtime=lambda_.Runtime.PYTHON_3_9,
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
             handler="query_processor.lambda_handler",
-            code=lambda_.Code.from_asset(
-                "../src",
-                bundling=BundlingOptions(
-                    image=lambda_.Runtime.PYTHON_3_9.bundling_image,
-                    command=[
-                        "bash", "-c",
-                        "pip install -r requirements.txt -t /asset-output && "
-                        "cp query_processor.py compression_service.py /asset-output/"
-                    ]
-                )
-            ),
+            code=lambda_code,
+            layers=[deps_layer],
             role=lambda_role,
             timeout=Duration.seconds(
                 self.node.try_get_context("lambda_timeout_query_processor") or 60
             ),
-            memory_size=self.node.try_get_context("lambda_memory_query_processor") or 256,
-            environment=common_env
+            # CPU scales with memory; 1024 MB keeps TLS setup and JSON parsing off the latency path.
+            # Re-tune per workload with AWS Lambda Power Tuning.
+            memory_size=self.node.try_get_context("lambda_memory_query_processor") or 1024,
+            environment=common_env,
+            snap_start=None if query_provisioned_concurrency else lambda_.SnapStartConf.ON_PUBLISHED_VERSIONS
+        )
+        
+        query_alias = lambda_.Alias(
+            self, "TakcQueryProcessorLive",
+            alias_name="live",
+            version=query_lambda.current_version,
+            provisioned_concurrent_executions=query_provisioned_concurrency or None
         )
         
         # Cognito User Pool for authentication
@@ -313,13 +339,20 @@ class TakcStack(Stack):
         
         # API Gateway /query endpoint with Cognito authorization
         query_resource = api.root.add_resource("query")
-        query_integration = apigw.LambdaIntegration(query_lambda)
+        query_integration = apigw.LambdaIntegration(query_alias)
         query_resource.add_method(
             "POST", 
             query_integration,
             authorizer=cognito_authorizer,
             authorization_type=apigw.AuthorizationType.COGNITO
         )
+        # GET variant of /query for idempotent, edge-cacheable queries
+        query_resource.add_method(
+            "GET",
+            query_integration,
+            authorizer=cognito_authorizer,
+            authorization_type=apigw.AuthorizationType.COGNITO
+        )
         
         # AWS WAF for API Gateway protection
         waf_rules = []
@@ -408,6 +441,39 @@ class TakcStack(Stack):
             web_acl_arn=web_acl.attr_arn
         )
         
+        # CloudFront in front of the API caches GET /query responses at the edge (if enabled).
+        # Authorization is part of the cache key, so a cached response is only served to the
+        # token that fetched it and never bypasses the Cognito authorizer.
+        enable_edge_cache = self.node.try_get_context("enable_edge_cache")
+        query_distribution = None
+        if enable_edge_cache is None or enable_edge_cache:
+            query_cache_policy = cloudfront.CachePolicy(
+                self, "TakcQueryCachePolicy",
+                cache_policy_name=f"takc-query-cache-{name_suffix}",
+                comment="Cache GET /query responses per query parameters and caller token",
+                default_ttl=Duration.seconds(60),
+                min_ttl=Duration.seconds(0),
+                max_ttl=Duration.minutes(5),
+                query_string_behavior=cloudfront.CacheQueryStringBehavior.allow_list(
+                    "query", "task_type", "compression_rate"
+                ),
+                header_behavior=cloudfront.CacheHeaderBehavior.allow_list("Authorization"),
+                enable_accept_encoding_gzip=True,
+                enable_accept_encoding_brotli=True
+            )
+            query_distribution = cloudfront.Distribution(
+                self, "TakcQueryDistribution",
+                comment=f"TAKC query edge cache ({environment})",
+                default_behavior=cloudfront.BehaviorOptions(
+                    origin=origins.RestApiOrigin(api),
+                    viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.HTTPS_ONLY,
+                    allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+                    cached_methods=cloudfront.CachedMethods.CACHE_GET_HEAD,
+                    cache_policy=query_cache_policy
+                ),
+                price_class=cloudfront.PriceClass.PRICE_CLASS_100
+            )
+        
         # CloudWatch Alarms (if monitoring enabled)
         enable_monitoring = self.node.try_get_context("enable_monitoring")
         if enable_monitoring is None or enable_monitoring:
@@ -421,12 +487,12 @@ class TakcStack(Stack):
                 comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD
             )
             
-            # Compression Processor errors alarm
+            # Raw-data files that exhausted their retries
             cloudwatch.Alarm(
-                self, "CompressionProcessorErrors",
-                alarm_name=f"takc-compression-processor-errors-{name_suffix}",
-                metric=compression_lambda.metric_errors(),
-                threshold=5,
+                self, "IngestDeadLetters",
+                alarm_name=f"takc-ingest-dlq-{name_suffix}",
+                metric=ingest_dlq.metric_approximate_number_of_messages_visible(),
+                threshold=0,
                 evaluation_periods=1,
                 comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD
             )
@@ -448,6 +514,13 @@ class TakcStack(Stack):
             description="API Gateway endpoint URL"
         )
         
+        if query_distribution is not None:
+            CfnOutput(
+                self, "EdgeApiEndpoint",
+                value=f"https://{query_distribution.distribution_domain_name}/",
+                description="CloudFront endpoint caching GET /query responses"
+            )
+        
         CfnOutput(
             self, "DataBucketName",
             value=data_bucket.bucket_name,
@@ -467,9 +540,9 @@ class TakcStack(Stack):
         )
         
         CfnOutput(
-            self, "CompressionProcessorFunction",
-            value=compression_lambda.function_name,
-            description="Compression processor Lambda function name"
+            self, "IngestDeadLetterQueueUrl",
+            value=ingest_dlq.queue_url,
+            description="SQS dead-letter queue for raw-data files that failed processing"
         )
         
         CfnOutput(
@@ -6,12 +6,50 @@ Example of using the Bedrock-powered TAKC compression service
 import os
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
 
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from bedrock_compression_service import BedrockCompressionService, CompressionConfig
 
+# Model access probe results are reused across runs for an hour
+MODEL_ACCESS_CACHE = os.path.expanduser(os.path.join('~', '.cache', 'takc', 'model_access.json'))
+MODEL_ACCESS_TTL_SECONDS = 3600
+
+
+def check_model_access(service, model_ids):
+    """Return {model_id: accessible}, probing Bedrock only for stale or unknown models"""
+    session = boto3.session.Session()
+    account = session.client('sts').get_caller_identity()['Account']
+    prefix = f"{account}:{session.region_name}:"
+    
+    try:
+        with open(MODEL_ACCESS_CACHE, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    
+    now = time.time()
+    fresh = {
+        model_id: cache[prefix + model_id]['accessible']
+        for model_id in model_ids
+        if prefix + model_id in cache
+        and now - cache[prefix + model_id]['checked_at'] < MODEL_ACCESS_TTL_SECONDS
+    }
+    
+    probed = service.test_models_access([m for m in model_ids if m not in fresh])
+    if probed:
+        cache.update({prefix + m: {'accessible': ok, 'checked_at': now} for m, ok in probed.items()})
+        os.makedirs(os.path.dirname(MODEL_ACCESS_CACHE), exist_ok=True)
+        with open(MODEL_ACCESS_CACHE, 'w') as f:
+            json.dump(cache, f)
+    
+    return {**fresh, **probed}
+
 
 def main():
     print("🚀 Bedrock TAKC Compression Example")
@@ -23,8 +61,10 @@ def main():
     # Test model access first
     print("\n📋 Testing Bedrock model access...")
     available_models = []
-    for name, model_id in service.list_available_models().items():
-        if service.test_model_access(model_id):
+    models = service.list_available_models()
+    access = check_model_access(service, list(models.values()))
+    for name, model_id in models.items():
+        if access[model_id]:
             available_models.append((name, model_id))
             print(f"✅ {name}: {model_id}")
         else:
@@ -66,9 +106,7 @@ def main():
     
     results = {}
     
-    for rate in compression_rates:
-        print(f"\n🔧 Testing {rate} compression...")
-        
+    def compress_at_rate(rate):
         # Create compression configuration
         config = CompressionConfig(
             compression_rate=rate,
@@ -85,10 +123,18 @@ A: Operating margin improved to 22% from 19%.
             '''.strip(),
             model_id=selected_model[1]
         )
+        return service.compress_context(context, config)
+    
+    # Rates are independent Bedrock calls, so submit them all at once
+    with ThreadPoolExecutor(max_workers=len(compression_rates)) as executor:
+        futures = {rate: executor.submit(compress_at_rate, rate) for rate in compression_rates}
+    
+    for rate in compression_rates:
+        print(f"\n🔧 Testing {rate} compression...")
         
         try:
-            # Perform compression
-            result = service.compress_context(context, config)
+            # Collect compression result
+            result = futures[rate].result()
             results[rate] = result
             
             print(f"  📊 Compression: {result['compression_ratio']:.1f}× "
@@ -0,0 +1,134 @@
+#!/bin/bash
+
+# TAKC Lambda Asset Build Script
+# Stages the Lambda deployment package once so `cdk synth` only has to hash files.
+# Invoked automatically through the "build" hook in cdk/cdk.json.
+
+set -e
+
+# Configuration
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_ROOT="$(dirname "$SCRIPT_DIR")"
+SRC_DIR="$PROJECT_ROOT/src"
+DIST_DIR="$PROJECT_ROOT/dist"
+FUNCTION_DIR="$DIST_DIR/lambda_fn"
+LAYER_DIR="$DIST_DIR/lambda_layer"
+LAYER_STAMP="$DIST_DIR/.lambda_layer.sha256"
+
+# Target Lambda runtime for dependency wheels (functions run on arm64 / Graviton)
+PYTHON_VERSION="3.12"
+PLATFORM="manylinux2014_aarch64"
+
+# Development-only requirements that never belong in the layer
+DEV_PACKAGES="pytest pytest-mock flake8"
+
+# Packages already provided by the Lambda Python runtime (removed after install,
+# since other dependencies pull them in transitively)
+RUNTIME_PACKAGES="boto3 botocore s3transfer jmespath python_dateutil dateutil urllib3 six"
+
+# Colors for output (logs go to stderr so `cdk synth` stdout stays a clean template)
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+log_info() {
+    echo -e "${GREEN}[INFO]${NC} $1" >&2
+}
+
+log_warn() {
+    echo -e "${YELLOW}[WARN]${NC} $1" >&2
+}
+
+log_error() {
+    echo -e "${RED}[ERROR]${NC} $1" >&2
+}
+
+# Build the shared dependency layer (skipped when requirements and target are unchanged)
+build_layer() {
+    local requirements_hash
+    requirements_hash="$( (cat "$SRC_DIR/requirements.txt"; echo "$PLATFORM $PYTHON_VERSION $DEV_PACKAGES $RUNTIME_PACKAGES") | sha256sum | cut -d' ' -f1)"
+
+    if [ -f "$LAYER_STAMP" ] && [ "$(cat "$LAYER_STAMP")" == "$requirements_hash" ]; then
+        log_info "Dependency layer up to date ✓"
+        return
+    fi
+
+    log_info "Building dependency layer in $LAYER_DIR..."
+
+    rm -rf "$LAYER_DIR"
+    mkdir -p "$LAYER_DIR/python"
+
+    # Runtime requirements only (boto3 is pinned for local development, the runtime ships its own)
+    local dev_pattern
+    dev_pattern="^($(echo "$DEV_PACKAGES boto3" | tr ' ' '|'))([<>=!~ ;\[]|$)"
+    grep -vE "$dev_pattern" "$SRC_DIR/requirements.txt" > "$DIST_DIR/requirements-layer.txt"
+
+    python3 -m pip install -q \
+        -r "$DIST_DIR/requirements-layer.txt" \
+        -t "$LAYER_DIR/python" \
+        --platform "$PLATFORM" \
+        --implementation cp \
+        --python-version "$PYTHON_VERSION" \
+        --only-binary=:all: \
+        --upgrade
+
+    local package
+    for package in $RUNTIME_PACKAGES; do
+        rm -rf "$LAYER_DIR/python/$package" "$LAYER_DIR/python/$package.py" "$LAYER_DIR/python/$package"-*.dist-info
+    done
+    rm -rf "$LAYER_DIR/python/bin"
+
+    echo "$requirements_hash" > "$LAYER_STAMP"
+
+    log_info "Dependency layer built ✓"
+}
+
+# Stage the handler modules shared by all functions
+build_function() {
+    log_info "Staging Lambda handlers in $FUNCTION_DIR..."
+
+    rm -rf "$FUNCTION_DIR"
+    mkdir -p "$FUNCTION_DIR"
+    cp "$SRC_DIR"/*.py "$FUNCTION_DIR/"
+
+    log_info "Lambda handlers staged ✓"
+}
+
+# Pre-compile bytecode so INIT does not compile modules on first import.
+# Bytecode is version specific, so this needs an interpreter matching the Lambda runtime.
+# unchecked-hash .pyc files stay valid even though asset zips normalize file timestamps.
+compile_bytecode() {
+    local target_python=""
+    local candidate
+
+    for candidate in "python$PYTHON_VERSION" python3; do
+        if [ "$("$candidate" -c 'import sys; print("%d.%d" % sys.version_info[:2])' 2> /dev/null)" == "$PYTHON_VERSION" ]; then
+            target_python="$candidate"
+            break
+        fi
+    done
+
+    if [ -z "$target_python" ]; then
+        log_warn "python$PYTHON_VERSION not found, skipping bytecode pre-compilation"
+        return
+    fi
+
+    log_info "Pre-compiling bytecode with $target_python..."
+    "$target_python" -m compileall -q -j 0 --invalidation-mode unchecked-hash "$LAYER_DIR" "$FUNCTION_DIR" || \
+        log_warn "Some modules failed to pre-compile; they will be compiled at import time"
+    log_info "Bytecode pre-compiled ✓"
+}
+
+main() {
+    if ! command -v python3 &> /dev/null; then
+        log_error "Python 3 is not installed. Please install Python 3 first."
+        exit 1
+    fi
+
+    build_layer
+    build_function
+    compile_bytecode
+}
+
+main "$@"
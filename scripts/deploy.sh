@@ -201,7 +201,7 @@ main() {
     log_info "2. Data will be automatically processed and compressed"
     log_info "3. Query the system via the API endpoint"
     log_info ""
-    log_info "Note: CDK automatically bundled Lambda functions during deployment."
+    log_info "Note: Lambda assets were staged by scripts/build.sh (cdk.json build hook)."
     log_info "See cdk/README.md for detailed usage instructions."
 }
 
@@ -15,12 +15,24 @@ Customer Responsibilities:
 """
 
 import json
+import orjson
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import os
+import re
 import time
 import hashlib
-from typing import Dict, List, Any, Optional, Tuple
+import gzip
+import io
+import threading
+import numpy as np
+import zstandard as zstd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
+from types import MappingProxyType
 from aws_lambda_powertools import Logger, Tracer, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 
@@ -29,6 +41,151 @@ logger = Logger(service="bedrock-compression")
 tracer = Tracer(service="bedrock-compression")
 metrics = Metrics(namespace="TAKC", service="bedrock-compression")
 
+# Adaptive retries back off on throttling; the larger pool and keep-alive serve concurrent compressions
+BEDROCK_CLIENT_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 6},
+    read_timeout=120,
+    max_pool_connections=64,
+    tcp_keepalive=True
+)
+
+# Processed chunks are stored as one zstd-compressed JSON Lines object ({"idx": i, "text": chunk} per line)
+CHUNKS_ARTIFACT_NAME = 'chunks.jsonl.zst'
+CHUNKS_ZSTD_LEVEL = 3
+
+# Legacy per-chunk downloads fan out across threads, so the S3 pool must be at least as wide
+S3_READ_WORKERS = 32
+S3_CLIENT_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 6},
+    max_pool_connections=64,
+    tcp_keepalive=True
+)
+
+# Target compression ratio for each compression rate
+COMPRESSION_RATIOS = MappingProxyType({
+    "ultra": 64,    # 64× compression - reduces context by ~98.4%
+    "high": 32,     # 32× compression - reduces context by ~96.9%
+    "medium": 16,   # 16× compression - reduces context by ~93.8%
+    "light": 8      # 8× compression - reduces context by ~87.5%
+})
+
+# Available Amazon Bedrock models
+AVAILABLE_MODELS = MappingProxyType({
+    "claude-3-haiku": "anthropic.claude-3-haiku-20240307-v1:0",
+    "claude-3-sonnet": "anthropic.claude-3-sonnet-20240229-v1:0",
+    "claude-3-opus": "anthropic.claude-3-opus-20240229-v1:0",
+    "llama2-13b": "meta.llama2-13b-chat-v1",
+    "llama2-70b": "meta.llama2-70b-chat-v1",
+    "titan-text": "amazon.titan-text-express-v1"
+})
+
+# Sentence boundary for the fallback compressor: whitespace after terminal punctuation and before
+# a new sentence, so decimals such as "$2.5B" are not split; the whitespace itself is captured
+_SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.!?])(\s+)(?=[A-Z0-9])')
+
+# Bedrock error codes meaning the request was throttled rather than rejected
+THROTTLE_CODES = frozenset({
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "ServiceQuotaExceededException",
+})
+
+# Cached :data payloads are stored zstd-compressed; the frame magic tells them apart from legacy text entries
+REDIS_DATA_ZSTD_LEVEL = 6
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Claude models on Bedrock that accept cache_control prompt caching checkpoints. Opt-in only: the default
+# claude-3-haiku is not listed, and Bedrock ignores the checkpoint when the task prompt is shorter than the
+# model's minimum cacheable prefix (1,024 tokens for most models)
+PROMPT_CACHING_MODELS = (
+    "anthropic.claude-3-5-haiku",
+    "anthropic.claude-3-7-sonnet",
+    "anthropic.claude-sonnet-4",
+    "anthropic.claude-opus-4",
+    "anthropic.claude-haiku-4",
+)
+
+# Upper bound on in-flight Bedrock calls per container (shared by all rates and chunks)
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get('BEDROCK_MAX_CONCURRENCY', 8))
+_bedrock_semaphore = threading.Semaphore(BEDROCK_MAX_CONCURRENCY)
+
+# Bedrock responses kept in memory per service instance (in front of the Redis response cache)
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+
+
+# Request body templates; only the prompt and output length vary per call
+_CLAUDE_BODY_TEMPLATE = {"anthropic_version": "bedrock-2023-05-31", "temperature": 0.1, "top_p": 0.9}
+_LLAMA_BODY_TEMPLATE = {"temperature": 0.1, "top_p": 0.9}
+_TITAN_GENERATION_TEMPLATE = {"temperature": 0.1, "topP": 0.9, "stopSequences": []}
+
+
+def _build_claude_body(prompt: str, chunk_prompt: str, target_tokens: int, model_id: str) -> Dict[str, Any]:
+    """Claude messages request; the task prompt is a cacheable prefix block"""
+    task_block = {"type": "text", "text": prompt}
+    if any(cache_model in model_id for cache_model in PROMPT_CACHING_MODELS):
+        task_block["cache_control"] = {"type": "ephemeral"}
+    return {
+        **_CLAUDE_BODY_TEMPLATE,
+        "max_tokens": min(target_tokens + 100, 4096),
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    task_block,
+                    {"type": "text", "text": chunk_prompt}
+                ]
+            }
+        ]
+    }
+
+
+def _build_llama_body(prompt: str, chunk_prompt: str, target_tokens: int, model_id: str) -> Dict[str, Any]:
+    """Llama text-completion request"""
+    return {
+        **_LLAMA_BODY_TEMPLATE,
+        "prompt": f"{prompt}\n{chunk_prompt}",
+        "max_gen_len": min(target_tokens + 100, 2048)
+    }
+
+
+def _build_titan_body(prompt: str, chunk_prompt: str, target_tokens: int, model_id: str) -> Dict[str, Any]:
+    """Titan text-generation request"""
+    return {
+        "inputText": f"{prompt}\n{chunk_prompt}",
+        "textGenerationConfig": {
+            **_TITAN_GENERATION_TEMPLATE,
+            "maxTokenCount": min(target_tokens + 100, 4096)
+        }
+    }
+
+
+def _extract_claude_text(payload: Dict[str, Any]) -> str:
+    """Generated text in a Claude stream event (only content_block_delta events carry text)"""
+    if payload.get('type') == 'content_block_delta':
+        return payload['delta'].get('text', '')
+    return ''
+
+
+def _extract_llama_text(payload: Dict[str, Any]) -> str:
+    """Generated text in a Llama stream chunk"""
+    return payload.get('generation', '')
+
+
+def _extract_titan_text(payload: Dict[str, Any]) -> str:
+    """Generated text in a Titan stream chunk"""
+    return payload.get('outputText', '')
+
+
+ModelAdapter = Tuple[Callable[[str, str, int, str], Dict[str, Any]], Callable[[Dict[str, Any]], str]]
+
+# Model-ID substring -> (request body builder, stream text extractor)
+MODEL_ADAPTERS: Tuple[Tuple[str, ModelAdapter], ...] = (
+    ("anthropic.claude", (_build_claude_body, _extract_claude_text)),
+    ("meta.llama", (_build_llama_body, _extract_llama_text)),
+    ("amazon.titan", (_build_titan_body, _extract_titan_text)),
+)
+
 
 @dataclass
 class CompressionConfig:
@@ -57,43 +214,44 @@ class BedrockCompressionService:
     - Implement appropriate security controls
     """
     
-    def __init__(self):
-        self.compression_ratios = {
-            "ultra": 64,    # 64× compression - reduces context by ~98.4%
-            "high": 32,     # 32× compression - reduces context by ~96.9%
-            "medium": 16,   # 16× compression - reduces context by ~93.8%
-            "light": 8      # 8× compression - reduces context by ~87.5%
-        }
-        
-        # Available Amazon Bedrock models
-        self.available_models = {
-            "claude-3-haiku": "anthropic.claude-3-haiku-20240307-v1:0",
-            "claude-3-sonnet": "anthropic.claude-3-sonnet-20240229-v1:0",
-            "claude-3-opus": "anthropic.claude-3-opus-20240229-v1:0",
-            "llama2-13b": "meta.llama2-13b-chat-v1",
-            "llama2-70b": "meta.llama2-70b-chat-v1",
-            "titan-text": "amazon.titan-text-express-v1"
-        }
-        
-        # Initialize AWS service clients
-        self.bedrock_runtime = boto3.client('bedrock-runtime')  # Amazon Bedrock Runtime client
-        self.s3_client = boto3.client('s3')  # Amazon S3 client
+    # Shared read-only tables (not rebuilt per instance)
+    compression_ratios = COMPRESSION_RATIOS
+    available_models = AVAILABLE_MODELS
+    
+    def __init__(self, bedrock_runtime=None, s3_client=None):
+        # Initialize AWS service clients (pre-built clients can be injected, e.g. in tests)
+        if bedrock_runtime is None:
+            bedrock_runtime = boto3.client('bedrock-runtime', config=BEDROCK_CLIENT_CONFIG)
+        if s3_client is None:
+            s3_client = boto3.client('s3', config=S3_CLIENT_CONFIG)
+        self.bedrock_runtime = bedrock_runtime  # Amazon Bedrock Runtime client
+        self.s3_client = s3_client  # Amazon S3 client
         self.redis_client = None  # Amazon ElastiCache Redis client (initialized if available)
+        self._model_access_cache: Dict[str, bool] = {}  # model_id -> result of test_model_access
+        self._model_adapters: Dict[str, ModelAdapter] = {}  # model_id -> (build_body, extract_text)
+        self._response_cache: "OrderedDict[str, str]" = OrderedDict()  # response cache key -> compressed text (LRU)
+        self._response_cache_lock = threading.Lock()
         
         # Get environment variables for AWS service configuration
         self.s3_bucket = os.environ.get('S3_BUCKET', 'takc-processed-data-b39b0734')
         self.redis_endpoint = os.environ.get('REDIS_ENDPOINT', '')
+        self.redis_port = int(os.environ.get('REDIS_PORT', 6379))
         self.default_model = os.environ.get('BEDROCK_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
         
         # Try to initialize Amazon ElastiCache Redis client if endpoint is available
         if self.redis_endpoint:
             try:
                 import redis
+                # Small blocking pool with keep-alive so warm invocations reuse the TLS connection
                 self.redis_client = redis.Redis(
-                    host=self.redis_endpoint,
-                    port=6379,
-                    ssl=True,
-                    decode_responses=True
+                    connection_pool=redis.BlockingConnectionPool(
+                        connection_class=redis.SSLConnection,
+                        host=self.redis_endpoint,
+                        port=self.redis_port,
+                        max_connections=4,
+                        socket_keepalive=True,
+                        decode_responses=False  # :data values are binary zstd frames
+                    )
                 )
                 logger.info("Redis client initialized successfully")
             except Exception as e:
@@ -129,183 +287,247 @@ CONTEXT TO COMPRESS:
     def _chunk_context(self, context: str, chunk_size: int = 512, overlap: int = 64) -> List[str]:
         """Split context into overlapping chunks for processing"""
         words = context.split()
-        chunks = []
         
-        start = 0
-        while start < len(words):
-            end = min(start + chunk_size, len(words))
-            chunk = ' '.join(words[start:end])
-            chunks.append(chunk)
-            
-            if end >= len(words):
-                break
-                
-            start = end - overlap
+        # A window starts every (chunk_size - overlap) words until one reaches the end;
+        # slicing clamps the final window to the remaining words
+        starts = range(0, max(1, len(words) - overlap), chunk_size - overlap) if words else ()
+        chunks = [' '.join(words[start:start + chunk_size]) for start in starts]
         
         logger.info(f"Split context into {len(chunks)} chunks")
         return chunks
     
     @tracer.capture_method
     def _invoke_bedrock_compression(self, prompt: str, context_chunk: str, 
-                                  compression_ratio: int, model_id: str) -> str:
+                                  compression_ratio: int, model_id: str,
+                                  input_tokens: Optional[int] = None) -> str:
         """
-        Invoke Amazon Bedrock model for KV cache compression with retry logic.
+        Invoke Amazon Bedrock model for KV cache compression.
         
-        Implements exponential backoff for handling rate limiting and transient errors
-        when calling Amazon Bedrock APIs.
+        Throttling and transient errors are retried by the client's adaptive retry mode;
+        a call that still fails falls back to extractive compression.
         """
         # Calculate target length based on compression ratio
-        input_tokens = len(context_chunk.split())
+        if input_tokens is None:
+            input_tokens = len(context_chunk.split())
         target_tokens = max(10, input_tokens // compression_ratio)
         
-        # Prepare the full prompt
-        full_prompt = f"""{prompt}
-{context_chunk}
+        # Prepare the chunk prompt (the task prompt is a static prefix shared by every chunk)
+        chunk_prompt = f"""{context_chunk}
 
 Please compress the above context to approximately {target_tokens} tokens while preserving all task-relevant information:"""
         
-        # Retry configuration for handling rate limiting
-        max_retries = 3
-        base_delay = 1.0  # Base delay in seconds
-        
-        for attempt in range(max_retries + 1):
+        # Identical inputs produce the same compression, so reuse earlier Bedrock responses
+        response_cache_key = "bedrock:resp:" + hashlib.sha256(
+            f"{model_id}|{compression_ratio}|{prompt}|{context_chunk}".encode('utf-8')
+        ).hexdigest()
+        cached_text = self._get_cached_response(response_cache_key)
+        if cached_text is not None:
+            metrics.add_metric(name="LocalResponseCacheHits", unit=MetricUnit.Count, value=1)
+            return cached_text
+        if self.redis_client:
             try:
-                # Prepare request based on Amazon Bedrock model type
-                if "anthropic.claude" in model_id:
-                    # Claude models via Amazon Bedrock
-                    body = {
-                        "anthropic_version": "bedrock-2023-05-31",
-                        "max_tokens": min(target_tokens + 100, 4096),
-                        "temperature": 0.1,
-                        "top_p": 0.9,
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": full_prompt
-                            }
-                        ]
-                    }
-                elif "meta.llama" in model_id:
-                    # Llama models via Amazon Bedrock
-                    body = {
-                        "prompt": full_prompt,
-                        "max_gen_len": min(target_tokens + 100, 2048),
-                        "temperature": 0.1,
-                        "top_p": 0.9
-                    }
-                elif "amazon.titan" in model_id:
-                    # Titan models
-                    body = {
-                        "inputText": full_prompt,
-                        "textGenerationConfig": {
-                            "maxTokenCount": min(target_tokens + 100, 4096),
-                            "temperature": 0.1,
-                            "topP": 0.9,
-                            "stopSequences": []
-                        }
-                    }
-                else:
-                    raise ValueError(f"Unsupported model: {model_id}")
-                
-                # Invoke Amazon Bedrock Runtime API for model inference
-                response = self.bedrock_runtime.invoke_model(
+                cached_text = self.redis_client.get(response_cache_key)
+                if cached_text is not None:
+                    metrics.add_metric(name="ResponseCacheHits", unit=MetricUnit.Count, value=1)
+                    cached_text = cached_text.decode('utf-8')
+                    self._put_cached_response(response_cache_key, cached_text)
+                    return cached_text
+                metrics.add_metric(name="ResponseCacheMisses", unit=MetricUnit.Count, value=1)
+            except Exception as e:
+                logger.warning(f"Response cache lookup failed: {e}")
+        
+        try:
+            # Build the request with the model family's adapter
+            build_body, extract_text = self._get_model_adapter(model_id)
+            body = build_body(prompt, chunk_prompt, target_tokens, model_id)
+            
+            # Stream the response so generation can be cut off once the target length is reached
+            word_budget = int(target_tokens * 1.2)
+            with _bedrock_semaphore:
+                response = self.bedrock_runtime.invoke_model_with_response_stream(
                     modelId=model_id,
                     contentType='application/json',
                     accept='application/json',
-                    body=json.dumps(body)
+                    body=orjson.dumps(body)
                 )
                 
-                # Parse response based on model type
-                response_body = json.loads(response['body'].read())
-                
-                if "anthropic.claude" in model_id:
-                    compressed_text = response_body['content'][0]['text'].strip()
-                elif "meta.llama" in model_id:
-                    compressed_text = response_body['generation'].strip()
-                elif "amazon.titan" in model_id:
-                    compressed_text = response_body['results'][0]['outputText'].strip()
-                else:
-                    compressed_text = str(response_body).strip()
-                
-                logger.debug(f"Compressed {input_tokens} tokens to {len(compressed_text.split())} tokens")
-                return compressed_text
-                
-            except Exception as e:
-                # Check if this is a rate limiting error
-                error_message = str(e).lower()
-                is_rate_limit = any(term in error_message for term in [
-                    'throttling', 'rate limit', 'too many requests', 'quota exceeded'
-                ])
-                
-                if is_rate_limit and attempt < max_retries:
-                    # Exponential backoff for rate limiting
-                    delay = base_delay * (2 ** attempt)
-                    logger.warning(f"Rate limiting detected, retrying in {delay} seconds (attempt {attempt + 1}/{max_retries + 1})")
-                    time.sleep(delay)
-                    continue
-                else:
-                    # Final attempt failed or non-rate-limit error
-                    logger.error(f"Amazon Bedrock invocation failed after {attempt + 1} attempts: {e}")
-                    return self._fallback_compression(context_chunk, compression_ratio)
+                stream = response['body']
+                parts = []
+                word_count = 0
+                for event in stream:
+                    if 'chunk' not in event:
+                        # botocore raises modeled stream errors as EventStreamError; an
+                        # unparsed error event is surfaced the same way
+                        error_name = next(iter(event), 'unknown')
+                        raise ClientError(
+                            {'Error': {'Code': error_name, 'Message': str(event.get(error_name))}},
+                            'InvokeModelWithResponseStream'
+                        )
+                    
+                    payload = orjson.loads(event['chunk']['bytes'])
+                    if payload.get('type') == 'message_start':
+                        cache_read_tokens = payload.get('message', {}).get('usage', {}).get('cache_read_input_tokens', 0)
+                        if cache_read_tokens:
+                            metrics.add_metric(name="PromptCacheReadTokens", unit=MetricUnit.Count, value=cache_read_tokens)
+                    
+                    billed_input_tokens = self._extract_stream_input_tokens(payload)
+                    if billed_input_tokens:
+                        metrics.add_metric(name="BedrockInputTokens", unit=MetricUnit.Count, value=billed_input_tokens)
+                    
+                    text = extract_text(payload)
+                    if text:
+                        parts.append(text)
+                        word_count += len(text.split())
+                        if word_count >= word_budget:
+                            stream.close()
+                            break
+            
+            compressed_text = ''.join(parts).strip()
+            
+            logger.debug(f"Compressed {input_tokens} tokens to ~{word_count} tokens")
+            
+            if compressed_text:
+                self._put_cached_response(response_cache_key, compressed_text)
+            if self.redis_client and compressed_text:
+                try:
+                    self.redis_client.setex(response_cache_key, 86400, compressed_text)  # 24 hour expiry
+                except Exception as e:
+                    logger.warning(f"Response cache store failed: {e}")
+            
+            return compressed_text
+            
+        except ClientError as e:
+            # botocore's adaptive retry mode has already retried throttling and transient errors.
+            # Mid-stream errors (EventStreamError) carry lowerCamelCase codes such as
+            # "throttlingException", so compare with the first letter capitalized
+            error_code = e.response.get('Error', {}).get('Code', '')
+            if error_code[:1].upper() + error_code[1:] in THROTTLE_CODES:
+                metrics.add_metric(name="BedrockThrottles", unit=MetricUnit.Count, value=1)
+                logger.warning(f"Amazon Bedrock throttled after retries: {e}")
+            else:
+                logger.error(f"Amazon Bedrock invocation failed: {e}")
+            return self._fallback_compression(context_chunk, compression_ratio)
+        except Exception as e:
+            logger.error(f"Amazon Bedrock invocation failed: {e}")
+            return self._fallback_compression(context_chunk, compression_ratio)
+    
+    def _get_cached_response(self, key: str) -> Optional[str]:
+        """Return an in-memory Bedrock response, marking it most recently used"""
+        with self._response_cache_lock:
+            text = self._response_cache.get(key)
+            if text is not None:
+                self._response_cache.move_to_end(key)
+            return text
+    
+    def _put_cached_response(self, key: str, text: str) -> None:
+        """Remember a Bedrock response, evicting the least recently used beyond RESPONSE_CACHE_SIZE"""
+        with self._response_cache_lock:
+            self._response_cache[key] = text
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+    
+    @staticmethod
+    def _count_tokens(chunk: str) -> int:
+        """Word count of a chunk from _chunk_context (words are joined by single spaces)"""
+        return chunk.count(' ') + 1 if chunk else 0
+    
+    @staticmethod
+    def _extract_stream_input_tokens(payload: Dict[str, Any]) -> int:
+        """Return the input token count reported in the first streamed chunk, if any"""
+        if payload.get('type') == 'message_start':
+            return payload.get('message', {}).get('usage', {}).get('input_tokens', 0)
+        # Llama and Titan report prompt size on their first chunk only
+        return payload.get('prompt_token_count') or payload.get('inputTextTokenCount') or 0
+    
+    def _get_model_adapter(self, model_id: str) -> ModelAdapter:
+        """Resolve (and cache) the request builder and stream parser for a model ID"""
+        adapter = self._model_adapters.get(model_id)
+        if adapter is None:
+            adapter = next((adapter for family, adapter in MODEL_ADAPTERS if family in model_id), None)
+            if adapter is None:
+                raise ValueError(f"Unsupported model: {model_id}")
+            self._model_adapters[model_id] = adapter
+        return adapter
     
     def _fallback_compression(self, context: str, compression_ratio: int) -> str:
         """Fallback compression method when Bedrock is not available"""
         logger.warning("Using fallback compression method")
-        sentences = context.split('. ')
-        target_sentences = max(1, len(sentences) // compression_ratio)
-        
-        # Simple scoring based on sentence length and position
-        scored_sentences = []
-        for i, sentence in enumerate(sentences):
-            # Position score (beginning and end are important)
-            pos_score = 1.0
-            if i < len(sentences) * 0.3:
-                pos_score = 1.5
-            elif i > len(sentences) * 0.7:
-                pos_score = 1.2
-            
-            # Length score (prefer medium-length sentences)
-            length_score = min(2.0, len(sentence.split()) / 10)
-            
-            total_score = pos_score * length_score
-            scored_sentences.append((sentence, total_score))
-        
-        # Sort by score and take top sentences
-        scored_sentences.sort(key=lambda x: x[1], reverse=True)
-        top_sentences = [s[0] for s in scored_sentences[:target_sentences]]
-        
-        # Restore original order
-        result = []
-        for sentence in sentences:
-            if sentence in top_sentences:
-                result.append(sentence)
+        parts = _SENTENCE_BOUNDARY_RE.split(context)
+        sentences = parts[0::2]
+        separators = [''] + parts[1::2]  # whitespace preceding each sentence
+        n = len(sentences)
+        target_sentences = max(1, n // compression_ratio)
+        
+        # Simple scoring based on sentence length and position (beginning and end are important)
+        positions = np.arange(n)
+        pos_scores = np.where(positions < n * 0.3, 1.5, np.where(positions > n * 0.7, 1.2, 1.0))
+        lengths = np.fromiter((len(sentence.split()) for sentence in sentences), dtype=np.int32, count=n)
+        scores = pos_scores * np.minimum(2.0, lengths / 10.0)
+        
+        # Take top sentences (stable, so ties keep the earlier sentence) and restore original order
+        keep = np.zeros(n, dtype=bool)
+        keep[np.argsort(-scores, kind='stable')[:target_sentences]] = True
+        kept_indices = np.flatnonzero(keep)
+        
+        # Re-emit each kept sentence with the whitespace that originally preceded it
+        return sentences[kept_indices[0]] + ''.join(separators[i] + sentences[i] for i in kept_indices[1:])
+    
+    def _compress_in_parallel(self, contexts: List[str], task_prompt: str,
+                              compression_ratio: int, model_id: str,
+                              token_counts: Optional[List[int]] = None) -> List[str]:
+        """Compress independent contexts concurrently, preserving their order
         
-        return '. '.join(result)
+        Repeated contexts are sent to Bedrock once and share the result.
+        """
+        if not contexts:
+            return []
+        if token_counts is None:
+            token_counts = [None] * len(contexts)
+        
+        # First occurrence of each distinct context -> its token count
+        unique = {}
+        for context, tokens in zip(contexts, token_counts):
+            unique.setdefault(context, tokens)
+        
+        if len(unique) == 1:
+            context, tokens = next(iter(unique.items()))
+            result = self._invoke_bedrock_compression(task_prompt, context, compression_ratio, model_id, tokens)
+            return [result] * len(contexts)
+        
+        with ThreadPoolExecutor(max_workers=min(BEDROCK_MAX_CONCURRENCY, len(unique))) as executor:
+            results = dict(zip(unique, executor.map(
+                lambda context, tokens: self._invoke_bedrock_compression(task_prompt, context, compression_ratio, model_id, tokens),
+                unique.keys(),
+                unique.values()
+            )))
+        return [results[context] for context in contexts]
     
     @tracer.capture_method
-    def _iterative_compression(self, chunks: List[str], task_prompt: str, 
-                             compression_ratio: int, model_id: str) -> str:
-        """Perform iterative compression as described in the whitepaper"""
-        compressed_cache = ""
-        
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Processing chunk {i+1}/{len(chunks)}")
-            
-            # Combine previous compressed cache with current chunk
-            if compressed_cache:
-                combined_context = f"{compressed_cache}\n\n{chunk}"
-            else:
-                combined_context = chunk
-            
-            # Compress the combined context with retry logic for rate limiting
-            compressed_result = self._invoke_bedrock_compression(
-                task_prompt, combined_context, compression_ratio, model_id
-            )
-            
-            # Update the compressed cache
-            compressed_cache = compressed_result
+    def _map_compress(self, chunks: List[str], task_prompt: str,
+                      compression_ratio: int, model_id: str,
+                      chunk_tokens: Optional[List[int]] = None) -> List[str]:
+        """Map step: compress every chunk independently at the target ratio"""
+        logger.info(f"Compressing {len(chunks)} chunks in parallel")
+        return self._compress_in_parallel(chunks, task_prompt, compression_ratio, model_id, chunk_tokens)
+    
+    @tracer.capture_method
+    def _reduce_compress(self, compressed_chunks: List[str], task_prompt: str, model_id: str) -> str:
+        """Reduce step: merge neighbouring compressed chunks pairwise until one remains
         
-        return compressed_cache
+        Each merge compresses two outputs at 2× so a merged result stays about the
+        size of one compressed chunk, keeping the overall ratio near the target.
+        """
+        level = list(compressed_chunks)
+        while len(level) > 1:
+            pairs = [f"{level[i]}\n\n{level[i + 1]}" for i in range(0, len(level) - 1, 2)]
+            merged = self._compress_in_parallel(pairs, task_prompt, 2, model_id)
+            if len(level) % 2:
+                merged.append(level[-1])
+            logger.info(f"Reduced {len(level)} compressed chunks to {len(merged)}")
+            level = merged
+        
+        return level[0] if level else ""
     
     @tracer.capture_method
     def compress_context(self, context: str, config: CompressionConfig) -> Dict[str, Any]:
@@ -354,11 +576,15 @@ Please compress the above context to approximately {target_tokens} tokens while
         
         logger.info(f"Compressing {len(chunks)} chunks at {compression_ratio}× ratio using {config.model_id}")
         
-        # Perform iterative compression
-        compressed_kv = self._iterative_compression(chunks, task_prompt, compression_ratio, config.model_id)
+        # Count tokens once per chunk; consecutive chunks share exactly overlap_size words
+        chunk_tokens = [self._count_tokens(chunk) for chunk in chunks]
+        original_tokens = sum(chunk_tokens) - config.overlap_size * max(0, len(chunks) - 1)
+        
+        # Compress chunks in parallel, then merge the results pairwise
+        compressed_chunks = self._map_compress(chunks, task_prompt, compression_ratio, config.model_id, chunk_tokens)
+        compressed_kv = self._reduce_compress(compressed_chunks, task_prompt, config.model_id)
         
         # Calculate compression statistics
-        original_tokens = len(context.split())
         compressed_tokens = len(compressed_kv.split())
         actual_ratio = original_tokens / max(1, compressed_tokens)
         
@@ -374,6 +600,32 @@ Please compress the above context to approximately {target_tokens} tokens while
             'model_used': config.model_id
         }
     
+    @tracer.capture_method
+    def read_chunks_from_s3(self, bucket: str, key_prefix: str, chunk_count: int,
+                            max_workers: int = S3_READ_WORKERS) -> List[str]:
+        """Read the chunks artifact, or chunk_0000..chunk_N objects concurrently for older uploads"""
+        try:
+            response = self.s3_client.get_object(
+                Bucket=bucket, Key=f"{key_prefix.rstrip('/')}/{CHUNKS_ARTIFACT_NAME}"
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'NoSuchKey':
+                raise
+        else:
+            with zstd.ZstdDecompressor().stream_reader(response['Body']) as reader:
+                records = [orjson.loads(line) for line in io.BufferedReader(reader) if line.strip()]
+            return [record['text'] for record in sorted(records, key=lambda record: record['idx'])]
+        
+        def read_chunk(index: int) -> str:
+            response = self.s3_client.get_object(Bucket=bucket, Key=f"{key_prefix}/chunk_{index:04d}.txt")
+            return response['Body'].read().decode('utf-8')
+        
+        if chunk_count <= 1:
+            return [read_chunk(i) for i in range(chunk_count)]
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, chunk_count)) as executor:
+            return list(executor.map(read_chunk, range(chunk_count)))
+    
     @tracer.capture_method
     def create_multi_rate_cache(self, task_type: str, context: str, 
                                task_description: str = None,
@@ -389,7 +641,12 @@ Please compress the above context to approximately {target_tokens} tokens while
         cache_keys = {}
         compression_results = {}
         
-        for rate in ["ultra", "high", "medium", "light"]:
+        # Queue all Redis writes and send them in a single round trip at the end
+        redis_pipeline = self.redis_client.pipeline(transaction=False) if self.redis_client else None
+        
+        rates = ["ultra", "high", "medium", "light"]
+        
+        def compress_at_rate(rate: str) -> Dict[str, Any]:
             logger.info(f"Creating {rate} compression cache...")
             
             config = CompressionConfig(
@@ -401,8 +658,15 @@ Please compress the above context to approximately {target_tokens} tokens while
                 model_id=model_id
             )
             
-            compressed_data = self.compress_context(context, config)
-            cache_key = self.store_compressed_cache(task_type, rate, compressed_data)
+            return self.compress_context(context, config)
+        
+        # The rates are independent Bedrock workloads, so run them concurrently
+        with ThreadPoolExecutor(max_workers=len(rates)) as executor:
+            compressed_by_rate = dict(zip(rates, executor.map(compress_at_rate, rates)))
+        
+        for rate in rates:
+            compressed_data = compressed_by_rate[rate]
+            cache_key = self.store_compressed_cache(task_type, rate, compressed_data, redis_pipeline)
             
             cache_keys[rate] = cache_key
             compression_results[rate] = {
@@ -410,6 +674,13 @@ Please compress the above context to approximately {target_tokens} tokens while
                 'tokens': compressed_data['compressed_tokens']
             }
         
+        if redis_pipeline is not None:
+            try:
+                redis_pipeline.execute()
+                logger.info(f"Stored {len(cache_keys)} caches in Redis")
+            except Exception as e:
+                logger.error(f"Failed to store in Redis: {e}")
+        
         # Print summary
         logger.info("Compression Summary:")
         for rate, result in compression_results.items():
@@ -419,8 +690,13 @@ Please compress the above context to approximately {target_tokens} tokens while
     
     @tracer.capture_method
     def store_compressed_cache(self, task_type: str, compression_rate: str, 
-                             compressed_data: Dict[str, Any]) -> str:
-        """Store compressed cache with enhanced metadata"""
+                             compressed_data: Dict[str, Any],
+                             redis_pipeline=None) -> str:
+        """Store compressed cache with enhanced metadata
+        
+        When redis_pipeline is given the Redis writes are only queued on it and
+        the caller is responsible for executing the pipeline.
+        """
         cache_key = f"takc:{task_type}:{compression_rate}"
         
         # Enhanced metadata
@@ -439,20 +715,23 @@ Please compress the above context to approximately {target_tokens} tokens while
             'version': '2.0'
         }
         
-        # Store in Redis if available
+        # Store in Redis if available (metadata and data in one round trip)
         if self.redis_client:
             try:
-                self.redis_client.setex(
+                pipe = redis_pipeline if redis_pipeline is not None else self.redis_client.pipeline(transaction=False)
+                pipe.setex(
                     f"{cache_key}:metadata", 
                     86400,  # 24 hour expiry
-                    json.dumps(metadata)
+                    orjson.dumps(metadata)
                 )
-                self.redis_client.setex(
+                pipe.setex(
                     f"{cache_key}:data", 
                     86400,  # 24 hour expiry
-                    compressed_data['compressed_kv']
+                    self._encode_cached_data(compressed_data['compressed_kv'])
                 )
-                logger.info(f"Stored cache in Redis: {cache_key}")
+                if redis_pipeline is None:
+                    pipe.execute()
+                    logger.info(f"Stored cache in Redis: {cache_key}")
             except Exception as e:
                 logger.error(f"Failed to store in Redis: {e}")
         
@@ -467,8 +746,9 @@ Please compress the above context to approximately {target_tokens} tokens while
             self.s3_client.put_object(
                 Bucket=self.s3_bucket,
                 Key=s3_key,
-                Body=json.dumps(cache_data, indent=2).encode('utf-8'),
-                ContentType='application/json'
+                Body=gzip.compress(orjson.dumps(cache_data), compresslevel=3),
+                ContentType='application/json',
+                ContentEncoding='gzip'
             )
             logger.info(f"Stored cache in S3: s3://{self.s3_bucket}/{s3_key}")
         except Exception as e:
@@ -484,13 +764,17 @@ Please compress the above context to approximately {target_tokens} tokens while
         # Try Amazon ElastiCache Redis first for fast retrieval
         if self.redis_client:
             try:
-                metadata = self.redis_client.get(f"{cache_key}:metadata")
-                data = self.redis_client.get(f"{cache_key}:data")
+                # Pipelined GETs rather than MGET: the two keys may live in different
+                # hash slots on a cluster-mode (serverless) cache
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(f"{cache_key}:metadata")
+                pipe.get(f"{cache_key}:data")
+                metadata, data = pipe.execute()
                 
                 if metadata and data:
                     return {
-                        'compressed_kv': data,
-                        'metadata': json.loads(metadata)
+                        'compressed_kv': self._decode_cached_data(data),
+                        'metadata': orjson.loads(metadata)
                     }
             except Exception as e:
                 logger.error(f"Redis retrieval failed: {e}")
@@ -502,7 +786,7 @@ Please compress the above context to approximately {target_tokens} tokens while
                 Bucket=self.s3_bucket,
                 Key=s3_key
             )
-            return json.loads(response['Body'].read().decode('utf-8'))
+            return self._read_json_body(response)
         except:
             pass
         
@@ -513,20 +797,53 @@ Please compress the above context to approximately {target_tokens} tokens while
                 Bucket=self.s3_bucket,
                 Key=s3_key
             )
-            return json.loads(response['Body'].read().decode('utf-8'))
+            return self._read_json_body(response)
         except Exception as e:
             logger.error(f"Cache not found: {e}")
             return None
     
+    @staticmethod
+    def _encode_cached_data(text: str) -> bytes:
+        """zstd-compress a cached context for storage under the :data key"""
+        return zstd.ZstdCompressor(level=REDIS_DATA_ZSTD_LEVEL).compress(text.encode('utf-8'))
+    
+    @staticmethod
+    def _decode_cached_data(value: bytes) -> str:
+        """Decode a :data value, accepting both zstd frames and legacy plain-text entries"""
+        if value.startswith(ZSTD_MAGIC):
+            value = zstd.ZstdDecompressor().decompress(value)
+        return value.decode('utf-8')
+    
+    @staticmethod
+    def _read_json_body(response: Dict[str, Any]) -> Any:
+        """Decode a JSON S3 object body, inflating it when stored gzip-encoded"""
+        body = response['Body'].read()
+        if response.get('ContentEncoding') == 'gzip':
+            body = gzip.decompress(body)
+        return orjson.loads(body)
+    
     def list_available_models(self) -> Dict[str, str]:
         """List available Bedrock models"""
-        return self.available_models
+        return dict(self.available_models)
     
     def test_model_access(self, model_id: str = None) -> bool:
-        """Test if we can access a specific Bedrock model"""
+        """Test if we can access a specific Bedrock model (result cached per service instance)"""
         if not model_id:
             model_id = self.default_model
         
+        if model_id not in self._model_access_cache:
+            self._model_access_cache[model_id] = self._probe_model_access(model_id)
+        return self._model_access_cache[model_id]
+    
+    def test_models_access(self, model_ids: List[str], max_workers: int = 8) -> Dict[str, bool]:
+        """Test access to several Bedrock models concurrently"""
+        if not model_ids:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(model_ids))) as executor:
+            return dict(zip(model_ids, executor.map(self.test_model_access, model_ids)))
+    
+    def _probe_model_access(self, model_id: str) -> bool:
+        """Send a minimal request to a Bedrock model to check access"""
         try:
             test_prompt = "Hello, this is a test. Please respond with 'Test successful'."
             
@@ -554,8 +871,10 @@ Please compress the above context to approximately {target_tokens} tokens while
                 modelId=model_id,
                 contentType='application/json',
                 accept='application/json',
-                body=json.dumps(body)
+                body=orjson.dumps(body)
             )
+            # Only the status matters; release the unread body's connection back to the pool
+            response['body'].close()
             
             logger.info(f"Successfully tested model: {model_id}")
             return True
@@ -565,6 +884,23 @@ Please compress the above context to approximately {target_tokens} tokens while
             return False
 
 
+# Service instance reused across warm invocations of the same container
+_service: Optional[BedrockCompressionService] = None
+
+
+def get_service() -> BedrockCompressionService:
+    """Return the container-wide BedrockCompressionService, creating it on first use"""
+    global _service
+    if _service is None:
+        _service = BedrockCompressionService()
+    return _service
+
+
+# Build the clients during Lambda INIT rather than on the first request
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    get_service()
+
+
 def lambda_handler(event, context):
     """AWS Lambda handler for S3-triggered compression"""
     try:
@@ -582,16 +918,11 @@ def lambda_handler(event, context):
         logger.info(f"Starting compression for task_type: {task_type}")
         
         # Read all chunks from S3
-        service = BedrockCompressionService()
+        service = get_service()
         bucket, key_prefix = chunks_location[5:].split('/', 1)
         
         # Combine all chunks into single context
-        chunks = []
-        for i in range(chunk_count):
-            chunk_key = f"{key_prefix}/chunk_{i:04d}.txt"
-            response = service.s3_client.get_object(Bucket=bucket, Key=chunk_key)
-            chunks.append(response['Body'].read().decode('utf-8'))
-        
+        chunks = service.read_chunks_from_s3(bucket, key_prefix, chunk_count)
         context = '\n\n'.join(chunks)
         
         # Create multi-rate compressed caches
@@ -641,8 +972,10 @@ def main():
     
     if args.test_models:
         print("Testing available Bedrock models:")
-        for name, model_id in service.list_available_models().items():
-            success = service.test_model_access(model_id)
+        models = service.list_available_models()
+        access = service.test_models_access(list(models.values()))
+        for name, model_id in models.items():
+            success = access[model_id]
             status = "✅" if success else "❌"
             print(f"  {status} {name}: {model_id}")
         return
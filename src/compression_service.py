@@ -4,13 +4,20 @@ Task-Aware Knowledge Compression Service
 Handles compression of knowledge at multiple rates for efficient reasoning.
 """
 
-import json
+import gzip
+import orjson
 import boto3
 import os
 import hashlib
 import re
+import time
+import numpy as np
+import zstandard as zstd
+from botocore.config import Config
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from aws_lambda_powertools import Logger, Tracer, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 
@@ -19,6 +26,121 @@ logger = Logger(service="compression-service")
 tracer = Tracer(service="compression-service")
 metrics = Metrics(namespace="TAKC", service="compression-service")
 
+# Clients are shared by every service instance in the process, so warm invocations
+# reuse their credentials and kept-alive connections
+CLIENT_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 6},
+    max_pool_connections=64,
+    tcp_keepalive=True
+)
+_clients: Dict[str, Any] = {}
+
+# Cached :data payloads are stored zstd-compressed; the frame magic tells them apart from legacy text entries
+REDIS_DATA_ZSTD_LEVEL = 3
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Contexts shorter than this many words are cached uncompressed
+MIN_COMPRESSIBLE_TOKENS = 50
+
+# Word counting splits at most this many characters at once, so large contexts never
+# materialize a list with every word
+TOKEN_COUNT_BLOCK_SIZE = 1 << 20
+
+# Sentence boundary used by the extractive compressor
+_SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Word tokens for task-relevance matching (punctuation is not part of a word)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Query terms that indicate multi-part, complex questions; matched at word starts so
+# inflections such as "compared" or "relationships" still count
+_COMPLEX_QUERY_RE = re.compile(r'\b(?:compare|synthesize|across|relationship|between)', re.IGNORECASE)
+
+# Domain terms that raise a sentence's importance score
+_KEY_TERMS = frozenset({"revenue", "profit", "sales", "growth", "increase", "decrease",
+                        "million", "billion", "percent", "market", "customer", "product"})
+
+
+def _encode_cached_data(text: str) -> bytes:
+    """zstd-compress a cached context for storage under the :data key"""
+    return zstd.ZstdCompressor(level=REDIS_DATA_ZSTD_LEVEL).compress(text.encode('utf-8'))
+
+
+def _decode_cached_data(value: bytes) -> str:
+    """Decode a :data value, accepting both zstd frames and legacy plain-text entries"""
+    if value.startswith(ZSTD_MAGIC):
+        value = zstd.ZstdDecompressor().decompress(value)
+    return value.decode('utf-8')
+
+
+def _get_client(service_name: str):
+    """Return the process-wide boto3 client for the given service"""
+    client = _clients.get(service_name)
+    if client is None:
+        client = _clients[service_name] = boto3.client(service_name, config=CLIENT_CONFIG)
+    return client
+
+
+def _count_tokens(text: str, block_size: int = TOKEN_COUNT_BLOCK_SIZE) -> int:
+    """Count whitespace-separated words exactly like len(text.split()), one bounded block at a time"""
+    count = 0
+    for start in range(0, len(text), block_size):
+        count += len(text[start:start + block_size].split())
+        # A word straddling the block boundary was counted once in each block
+        if start and not text[start - 1].isspace() and not text[start].isspace():
+            count -= 1
+    return count
+
+
+@lru_cache(maxsize=4096)
+def _classify_query(query: str) -> str:
+    """Classify a query as simple, moderate or complex (repeated queries are answered from cache)"""
+    if _COMPLEX_QUERY_RE.search(query):
+        return "complex"
+    elif len(query.split()) > 15:
+        return "moderate"
+    else:
+        return "simple"
+
+
+# Each entry pins a whole document plus its ranked paragraphs, so keep only the document(s) being
+# compressed at all rates right now
+@lru_cache(maxsize=2)
+def _rank_paragraphs(text: str, task_description: str) -> Tuple[Tuple[str, ...], int]:
+    """Rank non-empty paragraphs by task relevance (best first) and count all paragraphs"""
+    # Extract key terms from task description
+    task_terms = frozenset(_WORD_RE.findall(task_description.lower()))
+    
+    # Split text into paragraphs
+    paragraphs = text.split('\n\n')
+    
+    # Score paragraphs based on relevance to task
+    scored_paragraphs = []
+    for para in paragraphs:
+        if not para.strip():
+            continue
+            
+        # Count task-related terms (distinct words, without building a paragraph word set)
+        term_overlap = len(task_terms.intersection(_WORD_RE.findall(para.lower())))
+        
+        # Calculate relevance score
+        relevance_score = term_overlap / max(1, len(task_terms)) * 10
+        
+        # Add paragraph length factor (prefer medium-length paragraphs)
+        length = len(para.split())
+        length_factor = 1.0
+        if length < 10:
+            length_factor = 0.7
+        elif length > 100:
+            length_factor = 0.8
+            
+        final_score = relevance_score * length_factor
+        scored_paragraphs.append((para, final_score))
+    
+    # Sort by relevance score
+    scored_paragraphs.sort(key=lambda x: x[1], reverse=True)
+    return tuple(p[0] for p in scored_paragraphs), len(paragraphs)
+
 
 @dataclass
 class CompressionConfig:
@@ -29,7 +151,7 @@ class CompressionConfig:
 
 
 class CompressionService:
-    def __init__(self):
+    def __init__(self, s3_client=None, sts_client=None):
         self.compression_ratios = {
             "ultra": 0.015625,  # 64× compression
             "high": 0.03125,    # 32× compression
@@ -37,9 +159,11 @@ class CompressionService:
             "light": 0.125      # 8× compression
         }
         
-        # Initialize AWS clients
-        self.s3_client = boto3.client('s3')
+        # Initialize AWS clients (pre-built clients can be injected, e.g. in tests)
+        self.s3_client = s3_client if s3_client is not None else _get_client('s3')
+        self._sts_client = sts_client
         self.redis_client = None
+        self._account_id: Optional[str] = None  # resolved from STS on first use
         
         # Get environment variables
         self.s3_bucket = os.environ.get('S3_BUCKET', 'takc-processed-data-b39b0734')
@@ -53,10 +177,18 @@ class CompressionService:
                     host=self.redis_endpoint,
                     port=6379,
                     ssl=True,
-                    decode_responses=True
+                    decode_responses=False  # :data values are binary zstd frames
                 )
             except Exception as e:
-                print(f"Failed to initialize Redis client: {e}")
+                logger.warning(f"Failed to initialize Redis client: {e}")
+    
+    @property
+    def account_id(self) -> str:
+        """AWS account ID of the caller (looked up once per service instance)"""
+        if self._account_id is None:
+            sts_client = self._sts_client if self._sts_client is not None else _get_client('sts')
+            self._account_id = sts_client.get_caller_identity().get('Account')
+        return self._account_id
     
     def recommend_compression_rate(self, task_type: str, data_size: int, 
                                  query_complexity: str) -> str:
@@ -72,96 +204,55 @@ class CompressionService:
     
     def analyze_query_complexity(self, query: str) -> str:
         """Analyze query to determine its complexity level"""
-        complexity_indicators = ["compare", "synthesize", "across", "relationship", "between"]
-        
-        if any(indicator in query.lower() for indicator in complexity_indicators):
-            return "complex"
-        elif len(query.split()) > 15:
-            return "moderate"
-        else:
-            return "simple"
+        return _classify_query(query)
     
     def _extract_key_sentences(self, text: str, ratio: float) -> str:
         """Extract key sentences based on importance scoring"""
         # Split text into sentences
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = _SENT_SPLIT_RE.split(text)
         
         # Calculate number of sentences to keep
         num_to_keep = max(1, int(len(sentences) * ratio))
         
-        # Score sentences based on simple heuristics
-        scored_sentences = []
-        for i, sentence in enumerate(sentences):
-            # Score based on position (beginning and end sentences are important)
-            position_score = 1.0
-            if i < len(sentences) * 0.2:  # First 20%
-                position_score = 1.5
-            elif i > len(sentences) * 0.8:  # Last 20%
-                position_score = 1.2
-                
-            # Score based on presence of key terms
-            key_terms = ["revenue", "profit", "sales", "growth", "increase", "decrease", 
-                        "million", "billion", "percent", "market", "customer", "product"]
-            term_score = sum(1 for term in key_terms if term.lower() in sentence.lower()) * 0.5
-            
-            # Score based on sentence length (prefer medium length sentences)
-            words = sentence.split()
-            length = len(words)
-            length_score = 1.0
-            if 5 <= length <= 25:
-                length_score = 1.2
-            elif length > 40:
-                length_score = 0.7
-                
-            # Calculate final score
-            final_score = position_score + term_score + length_score
-            scored_sentences.append((sentence, final_score))
+        # Score sentences based on simple heuristics, one array operation per heuristic
+        n = len(sentences)
+        positions = np.arange(n)
         
-        # Sort sentences by score and keep top ones
-        scored_sentences.sort(key=lambda x: x[1], reverse=True)
-        top_sentences = [s[0] for s in scored_sentences[:num_to_keep]]
+        # Score based on position (first 20% and last 20% of sentences are important)
+        position_scores = np.where(positions < n * 0.2, 1.5, np.where(positions > n * 0.8, 1.2, 1.0))
         
-        # Restore original order
-        ordered_top_sentences = [s for s in sentences if s in top_sentences]
+        # Score based on presence of key terms
+        term_counts = np.fromiter(
+            (sum(1 for term in _KEY_TERMS if term in sentence_lower)
+             for sentence_lower in (sentence.lower() for sentence in sentences)),
+            dtype=np.int32, count=n
+        )
         
-        return ' '.join(ordered_top_sentences)
+        # Score based on sentence length (prefer medium length sentences)
+        lengths = np.fromiter((len(sentence.split()) for sentence in sentences), dtype=np.int32, count=n)
+        length_scores = np.where((lengths >= 5) & (lengths <= 25), 1.2, np.where(lengths > 40, 0.7, 1.0))
+        
+        scores = position_scores + term_counts * 0.5 + length_scores
+        
+        # Keep the top-scoring sentences in original order; ties at the cut-off keep the earlier
+        # sentences. Selecting with a linear-time partition avoids sorting every score.
+        if num_to_keep >= n:
+            keep = np.ones(n, dtype=bool)
+        else:
+            threshold = np.partition(scores, n - num_to_keep)[n - num_to_keep]
+            keep = scores > threshold
+            keep[np.flatnonzero(scores == threshold)[:num_to_keep - np.count_nonzero(keep)]] = True
+        
+        return ' '.join(sentence for sentence, kept in zip(sentences, keep) if kept)
     
     def _task_aware_filtering(self, text: str, task_description: str, ratio: float) -> str:
         """Filter content based on task relevance"""
-        # Extract key terms from task description
-        task_terms = set(task_description.lower().split())
+        # Paragraph ranking depends only on the text and task, so every rate reuses it
+        ranked_paragraphs, paragraph_count = _rank_paragraphs(text, task_description)
         
-        # Split text into paragraphs
-        paragraphs = text.split('\n\n')
-        
-        # Score paragraphs based on relevance to task
-        scored_paragraphs = []
-        for para in paragraphs:
-            if not para.strip():
-                continue
-                
-            # Count task-related terms
-            para_terms = set(para.lower().split())
-            term_overlap = len(task_terms.intersection(para_terms))
-            
-            # Calculate relevance score
-            relevance_score = term_overlap / max(1, len(task_terms)) * 10
-            
-            # Add paragraph length factor (prefer medium-length paragraphs)
-            length = len(para.split())
-            length_factor = 1.0
-            if length < 10:
-                length_factor = 0.7
-            elif length > 100:
-                length_factor = 0.8
-                
-            final_score = relevance_score * length_factor
-            scored_paragraphs.append((para, final_score))
-        
-        # Sort by relevance score and keep top paragraphs
-        scored_paragraphs.sort(key=lambda x: x[1], reverse=True)
-        num_to_keep = max(1, int(len(paragraphs) * ratio))
-        compressed_text = '\n\n'.join(p[0] for p in scored_paragraphs[:num_to_keep])
+        # Keep top paragraphs
+        num_to_keep = max(1, int(paragraph_count * ratio))
+        compressed_text = '\n\n'.join(ranked_paragraphs[:num_to_keep])
         
         return compressed_text
     
@@ -169,16 +260,21 @@ class CompressionService:
     def compress_context(self, context: str, config: CompressionConfig) -> Dict[str, Any]:
         """Perform task-aware compression of the context"""
         ratio = self.compression_ratios[config.compression_rate]
+        original_tokens = _count_tokens(context)
         
-        # Apply task-aware filtering
-        filtered_text = self._task_aware_filtering(context, config.task_description, ratio * 2)
-        
-        # Apply sentence extraction on the filtered text
-        compressed_text = self._extract_key_sentences(filtered_text, ratio * 2)
+        if original_tokens < MIN_COMPRESSIBLE_TOKENS:
+            # Too small for scoring to remove anything worthwhile; keep the context as is
+            compressed_text = context
+            compressed_tokens = original_tokens
+        else:
+            # Apply task-aware filtering
+            filtered_text = self._task_aware_filtering(context, config.task_description, ratio * 2)
+            
+            # Apply sentence extraction on the filtered text
+            compressed_text = self._extract_key_sentences(filtered_text, ratio * 2)
+            compressed_tokens = _count_tokens(compressed_text)
         
         # Calculate compression statistics
-        original_tokens = len(context.split())
-        compressed_tokens = len(compressed_text.split())
         
         return {
             'compressed_kv': compressed_text,
@@ -205,17 +301,20 @@ class CompressionService:
             'compressed_tokens': compressed_data['compressed_tokens'],
             'compression_ratio': compressed_data['compression_ratio'],
             'task_type': task_type,
-            'timestamp': str(boto3.client('sts').get_caller_identity().get('Account'))
+            'timestamp': int(time.time()),
+            'account_id': self.account_id
         }
         
-        # Try to store in Redis if available
+        # Try to store in Redis if available (metadata and data in one round trip)
         if self.redis_client:
             try:
-                self.redis_client.set(f"{cache_key}:metadata", json.dumps(metadata))
-                self.redis_client.set(f"{cache_key}:data", compressed_data['compressed_kv'])
-                print(f"Stored cache in Redis with key: {cache_key}")
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.set(f"{cache_key}:metadata", orjson.dumps(metadata))
+                pipe.set(f"{cache_key}:data", _encode_cached_data(compressed_data['compressed_kv']))
+                pipe.execute()
+                logger.info(f"Stored cache in Redis: {cache_key}")
             except Exception as e:
-                print(f"Failed to store in Redis: {e}")
+                logger.error(f"Failed to store in Redis: {e}")
         
         # Always store in S3 as backup
         try:
@@ -228,11 +327,13 @@ class CompressionService:
             self.s3_client.put_object(
                 Bucket=self.s3_bucket,
                 Key=s3_key,
-                Body=json.dumps(cache_data).encode('utf-8')
+                Body=gzip.compress(orjson.dumps(cache_data), compresslevel=3),
+                ContentType='application/json',
+                ContentEncoding='gzip'
             )
-            print(f"Stored cache in S3: s3://{self.s3_bucket}/{s3_key}")
+            logger.info(f"Stored cache in S3: s3://{self.s3_bucket}/{s3_key}")
         except Exception as e:
-            print(f"Failed to store in S3: {e}")
+            logger.error(f"Failed to store in S3: {e}")
         
         return cache_key
     
@@ -244,16 +345,20 @@ class CompressionService:
         # Try to get from Redis first if available
         if self.redis_client:
             try:
-                metadata = self.redis_client.get(f"{cache_key}:metadata")
-                data = self.redis_client.get(f"{cache_key}:data")
+                # Pipelined GETs rather than MGET: the two keys may live in different
+                # hash slots on a cluster-mode (serverless) cache
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(f"{cache_key}:metadata")
+                pipe.get(f"{cache_key}:data")
+                metadata, data = pipe.execute()
                 
                 if metadata and data:
                     return {
-                        'compressed_kv': data,
-                        'metadata': json.loads(metadata)
+                        'compressed_kv': _decode_cached_data(data),
+                        'metadata': orjson.loads(metadata)
                     }
             except Exception as e:
-                print(f"Failed to retrieve from Redis: {e}")
+                logger.warning(f"Failed to retrieve from Redis: {e}")
         
         # Fall back to S3
         try:
@@ -263,10 +368,13 @@ class CompressionService:
                 Key=s3_key
             )
             
-            cache_data = json.loads(response['Body'].read().decode('utf-8'))
+            body = response['Body'].read()
+            if response.get('ContentEncoding') == 'gzip':
+                body = gzip.decompress(body)
+            cache_data = orjson.loads(body)
             return cache_data
         except Exception as e:
-            print(f"Failed to retrieve from S3: {e}")
+            logger.warning(f"Failed to retrieve from S3: {e}")
             
             # If no cache exists, try to create one from available data
             try:
@@ -297,7 +405,7 @@ class CompressionService:
                     }
                 }
             except Exception as auto_e:
-                print(f"Failed to auto-generate cache: {auto_e}")
+                logger.exception(f"Failed to auto-generate cache: {auto_e}")
                 return None
     
     def create_compressed_cache(self, task_type: str, context: str, 
@@ -306,17 +414,21 @@ class CompressionService:
         if compression_rates is None:
             compression_rates = ["ultra", "high", "medium", "light"]
         
-        cache_keys = {}
-        
-        for rate in compression_rates:
-            config = CompressionConfig(
+        # Compression is CPU-bound and shares the cached paragraph ranking, so it runs in order
+        compressed_by_rate = {
+            rate: self.compress_context(context, CompressionConfig(
                 compression_rate=rate,
                 task_description=f"Process queries related to {task_type}"
-            )
-            
-            compressed_data = self.compress_context(context, config)
-            cache_key = self.store_compressed_cache(task_type, rate, compressed_data)
-            cache_keys[rate] = cache_key
+            ))
+            for rate in compression_rates
+        }
+        
+        # The stores are independent S3/Redis round trips, so send them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, len(compressed_by_rate))) as executor:
+            cache_keys = dict(zip(compressed_by_rate, executor.map(
+                lambda rate: self.store_compressed_cache(task_type, rate, compressed_by_rate[rate]),
+                compressed_by_rate
+            )))
         
         return cache_keys
 
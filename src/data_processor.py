@@ -7,18 +7,52 @@ Handles data ingestion from various sources and prepares it for compression.
 import json
 import boto3
 import argparse
+import io
 import os
-from typing import Dict, List, Any
+import zstandard as zstd
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
+from functools import cached_property
 from aws_lambda_powertools import Logger, Tracer, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
+from bedrock_compression_service import CHUNKS_ARTIFACT_NAME, CHUNKS_ZSTD_LEVEL, lambda_handler as compression_handler
+
 # Initialize Powertools
 logger = Logger(service="data-processor")
 tracer = Tracer(service="data-processor")
 metrics = Metrics(namespace="TAKC", service="data-processor")
 
+# Concurrent reads (and ranged GETs within each read) share one pool of kept-alive connections
+S3_CLIENT_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 6},
+    max_pool_connections=64,
+    tcp_keepalive=True
+)
+
+# Clients are shared by every DataProcessor in the process and survive across warm invocations
+_clients: Dict[str, Any] = {}
+
+# Large raw-data objects are downloaded as concurrent ranged GETs
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
+
+
+def _get_client(service_name: str, config: Optional[Config] = None):
+    """Return the process-wide boto3 client for the given service"""
+    client = _clients.get(service_name)
+    if client is None:
+        client = _clients[service_name] = boto3.client(service_name, config=config)
+    return client
+
 
 @dataclass
 class ProcessingConfig:
@@ -28,20 +62,34 @@ class ProcessingConfig:
 
 
 class DataProcessor:
-    def __init__(self):
-        self.s3_client = boto3.client('s3')
-        self.kinesis_client = boto3.client('kinesis')
-        self.lambda_client = boto3.client('lambda')
+    # Clients are built on first use, so S3-only invocations never create a Kinesis client
+    @cached_property
+    def s3_client(self):
+        return _get_client('s3', S3_CLIENT_CONFIG)
+    
+    @cached_property
+    def kinesis_client(self):
+        return _get_client('kinesis')
     
     @tracer.capture_method
     def read_from_s3(self, bucket: str, key: str) -> str:
         """Read data from S3 bucket"""
         try:
-            response = self.s3_client.get_object(Bucket=bucket, Key=key)
-            return response['Body'].read().decode('utf-8')
+            buffer = io.BytesIO()
+            self.s3_client.download_fileobj(bucket, key, buffer, Config=S3_TRANSFER_CONFIG)
+            return buffer.getvalue().decode('utf-8')
         except Exception as e:
             raise Exception(f"Failed to read from S3: {e}")
     
+    @tracer.capture_method
+    def read_many_from_s3(self, locations: List[Tuple[str, str]], max_workers: int = 16) -> List[str]:
+        """Read several S3 objects concurrently, preserving input order"""
+        if len(locations) <= 1:
+            return [self.read_from_s3(bucket, key) for bucket, key in locations]
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(locations))) as executor:
+            return list(executor.map(lambda location: self.read_from_s3(*location), locations))
+    
     def read_from_kinesis(self, stream_name: str, shard_id: str = None) -> List[str]:
         """Read data from Kinesis stream"""
         try:
@@ -87,46 +135,41 @@ class DataProcessor:
         return processed
     
     def chunk_data(self, data: str, chunk_size: int, overlap: int = 0) -> List[str]:
-        """Split data into overlapping chunks"""
+        """Split data into overlapping chunks of words"""
         words = data.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk)
-        
-        return chunks
+        return [' '.join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size - overlap)]
     
     @tracer.capture_method
     def store_chunks(self, chunks: List[str], output_location: str) -> None:
-        """Store processed chunks to S3"""
+        """Store processed chunks to S3 as a single zstd-compressed JSON Lines object"""
         if output_location.startswith('s3://'):
             bucket, key_prefix = output_location[5:].split('/', 1)
             
-            for i, chunk in enumerate(chunks):
-                key = f"{key_prefix}/chunk_{i:04d}.txt"
-                self.s3_client.put_object(
-                    Bucket=bucket,
-                    Key=key,
-                    Body=chunk.encode('utf-8')
-                )
+            lines = ''.join(json.dumps({'idx': i, 'text': chunk}) + '\n' for i, chunk in enumerate(chunks))
+            self.s3_client.put_object(
+                Bucket=bucket,
+                Key=f"{key_prefix.rstrip('/')}/{CHUNKS_ARTIFACT_NAME}",
+                Body=zstd.ZstdCompressor(level=CHUNKS_ZSTD_LEVEL).compress(lines.encode('utf-8')),
+                ContentType='application/x-ndjson'
+            )
     
     @tracer.capture_method
     def process_data(self, source_type: str, source_location: str, 
-                    task_type: str, config: ProcessingConfig = None) -> Dict[str, Any]:
-        """Main processing function"""
+                    task_type: str, config: ProcessingConfig = None,
+                    data: Optional[str] = None) -> Dict[str, Any]:
+        """Main processing function (data may be passed in when already read)"""
         if config is None:
             config = ProcessingConfig()
         
         # Read data based on source type
-        if source_type == 's3':
-            bucket, key = source_location[5:].split('/', 1)
-            data = self.read_from_s3(bucket, key)
-        elif source_type == 'kinesis':
-            data = '\n'.join(self.read_from_kinesis(source_location))
-        else:
-            raise ValueError(f"Unsupported source type: {source_type}")
+        if data is None:
+            if source_type == 's3':
+                bucket, key = source_location[5:].split('/', 1)
+                data = self.read_from_s3(bucket, key)
+            elif source_type == 'kinesis':
+                data = '\n'.join(self.read_from_kinesis(source_location))
+            else:
+                raise ValueError(f"Unsupported source type: {source_type}")
         
         # Process and chunk data
         processed_data = self.preprocess_data(data, config)
@@ -145,19 +188,56 @@ class DataProcessor:
         }
 
 
+# Processor instance reused across warm invocations of the same container
+_processor: Optional[DataProcessor] = None
+
+
+def get_processor() -> DataProcessor:
+    """Return the container-wide DataProcessor, creating it on first use"""
+    global _processor
+    if _processor is None:
+        _processor = DataProcessor()
+    return _processor
+
+
+# Build the S3 client every invocation needs during Lambda INIT rather than on the first request
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    get_processor().s3_client
+
+
+def _extract_s3_records(event: dict) -> List[Dict[str, Any]]:
+    """Return S3 event records, unwrapping S3 notifications delivered through SQS"""
+    s3_records = []
+    for record in event.get('Records', []):
+        if record.get('eventSource') == 'aws:sqs':
+            # SQS message body is the original S3 notification (or an s3:TestEvent without Records)
+            s3_records.extend(json.loads(record['body']).get('Records', []))
+        elif 's3' in record:
+            s3_records.append(record)
+    return s3_records
+
+
 @logger.inject_lambda_context(log_event=True)
 @tracer.capture_lambda_handler
 @metrics.log_metrics(capture_cold_start_metric=True)
 def lambda_handler(event: dict, context: LambdaContext):
-    """AWS Lambda handler for S3-triggered data processing"""
+    """AWS Lambda handler for S3-triggered data processing (direct or batched through SQS)"""
+    from_sqs = any(record.get('eventSource') == 'aws:sqs' for record in event.get('Records', []))
     try:
         # Handle S3 event notification
         if 'Records' in event:
-            for record in event['Records']:
-                # Extract S3 bucket and key from event
-                bucket = record['s3']['bucket']['name']
-                key = record['s3']['object']['key']
-                
+            # Extract S3 bucket and key from each record and fetch all objects concurrently
+            locations = [
+                (record['s3']['bucket']['name'], record['s3']['object']['key'])
+                for record in _extract_s3_records(event)
+            ]
+            processor = get_processor()
+            contents = processor.read_many_from_s3(locations)
+            
+            # Chunks are stored per task type, so a batch only needs one compression per task type
+            compression_payloads = {}
+            
+            for (bucket, key), data in zip(locations, contents):
                 logger.info("Processing S3 event", extra={
                     "bucket": bucket,
                     "key": key
@@ -176,8 +256,7 @@ def lambda_handler(event: dict, context: LambdaContext):
                     preprocessing_steps=['clean_whitespace']
                 )
                 
-                processor = DataProcessor()
-                result = processor.process_data('s3', source_location, task_type, config)
+                result = processor.process_data('s3', source_location, task_type, config, data=data)
                 
                 logger.info("Data processing completed", extra={
                     "task_type": task_type,
@@ -186,22 +265,30 @@ def lambda_handler(event: dict, context: LambdaContext):
                 metrics.add_metric(name="ChunksCreated", unit=MetricUnit.Count, value=result['chunk_count'])
                 metrics.add_dimension(name="TaskType", value=task_type)
                 
-                # Invoke compression Lambda after successful processing
-                lambda_client = boto3.client('lambda')
-                compression_payload = {
+                compression_payloads[task_type] = {
                     'task_type': task_type,
                     'chunks_location': result['chunks_location'],
                     'chunk_count': result['chunk_count']
                 }
+            
+            # Compress in-process after successful processing (no Lambda-to-Lambda hop)
+            failed_task_types = []
+            for task_type, compression_payload in compression_payloads.items():
+                compression_result = compression_handler(compression_payload, context)
                 
-                lambda_client.invoke(
-                    FunctionName=os.environ.get('COMPRESSION_LAMBDA_NAME'),
-                    InvocationType='Event',  # Async invocation
-                    Payload=json.dumps(compression_payload)
-                )
-                
-                logger.info("Triggered compression Lambda", extra={"task_type": task_type})
+                logger.info("Compression finished", extra={
+                    "task_type": task_type,
+                    "status_code": compression_result['statusCode']
+                })
                 metrics.add_metric(name="CompressionTriggered", unit=MetricUnit.Count, value=1)
+                if compression_result['statusCode'] != 200:
+                    failed_task_types.append(task_type)
+            
+            # The compression handler reports failures as a status code; surface them so an
+            # SQS batch is retried (and eventually dead-lettered) instead of deleted
+            if failed_task_types:
+                metrics.add_metric(name="CompressionFailures", unit=MetricUnit.Count, value=len(failed_task_types))
+                raise RuntimeError(f"Compression failed for task types: {', '.join(failed_task_types)}")
         
         return {
             'statusCode': 200,
@@ -210,12 +297,14 @@ def lambda_handler(event: dict, context: LambdaContext):
         
     except Exception as e:
         print(f"Processing failed: {e}")
+        if from_sqs:
+            # Fail the batch so SQS retries it and eventually moves it to the dead-letter queue
+            raise
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
 
-
 def main():
     parser = argparse.ArgumentParser(description='Process data for TAKC compression')
     parser.add_argument('--source', required=True, help='Data source location')
@@ -4,11 +4,19 @@ Enhanced Query Client for TAKC System
 Handles query processing with dynamic compression rate selection.
 """
 
-import json
+import gzip
+import orjson
 import boto3
+from botocore.config import Config
 import os
 import re
-from typing import Dict, Any, Optional
+import socket
+import time
+import zstandard as zstd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from aws_lambda_powertools import Logger, Tracer, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
@@ -18,6 +26,179 @@ logger = Logger(service="query-processor")
 tracer = Tracer(service="query-processor")
 metrics = Metrics(namespace="TAKC", service="query-processor")
 
+# Seconds CloudFront may serve a successful GET /query response from the edge
+QUERY_RESPONSE_MAX_AGE = int(os.environ.get('QUERY_RESPONSE_MAX_AGE', 60))
+
+# Model that answers queries from the compressed context
+BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+
+# Fixed closing section of every answer prompt
+_RESPONSE_INSTRUCTIONS = """Instructions:
+1. Answer the query using ONLY the information from the compressed knowledge above
+2. Be concise and specific
+3. If the information is not in the compressed knowledge, say "I don't have that information in the provided context"
+4. Do not make up information
+
+Answer:"""
+
+# AWS clients (and the Redis connection pool) reused across warm invocations of the same container
+_clients: Dict[str, Any] = {}
+_redis_client = None
+_redis_missing = False
+_lookup_executor: Optional[ThreadPoolExecutor] = None
+_redis_retry_at = 0.0
+
+# Decoded caches by (task_type, compression_rate), least recently used first
+_local_caches: OrderedDict = OrderedDict()
+
+# Keep-alive connections and adaptive retries for every client on the synchronous query path.
+# Timeouts and attempts are bounded so a slow dependency fails within API Gateway's 29 s limit;
+# the pool covers concurrent ranged GETs plus the parallel Redis/S3 lookup.
+CLIENT_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 3},
+    max_pool_connections=16,
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=10
+)
+
+# Answer generation streams no bytes until the model finishes, so it gets a longer read timeout
+CLIENT_CONFIG_OVERRIDES = {
+    'bedrock-runtime': Config(read_timeout=25, retries={'mode': 'adaptive', 'max_attempts': 1})
+}
+
+
+# Word prefixes that mark simple and complex queries; matching starts at a word boundary, like
+# compression_service, so "trends" counts as "trend" but "show" does not count as "how"
+_SIMPLE_QUERY_RE = re.compile(r'\b(?:what|when|who|total|sum|revenue|profit)', re.IGNORECASE)
+_COMPLEX_QUERY_RE = re.compile(r'\b(?:analy[sz]|compar|explain|why|how|relationship|trend)', re.IGNORECASE)
+
+# Start keep-alive probes after 30 s idle (Linux-only option, as on Lambda)
+REDIS_KEEPALIVE_OPTIONS = {socket.TCP_KEEPIDLE: 30} if hasattr(socket, 'TCP_KEEPIDLE') else {}
+
+# Decoded caches a warm container keeps, and for how many seconds before re-reading Redis/S3
+LOCAL_CACHE_SIZE = 8
+LOCAL_CACHE_TTL = int(os.environ.get('LOCAL_CACHE_TTL', 300))
+
+# Seconds to bypass Redis after a failed lookup
+REDIS_RETRY_INTERVAL = 60
+
+# Redis :data values are zstd frames (legacy entries are plain text)
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Start the S3 cache read together with the Redis lookup (costs an extra GET on Redis hits)
+CACHE_PARALLEL_LOOKUP = os.environ.get('CACHE_PARALLEL_LOOKUP', 'false').lower() == 'true'
+
+# Rates fetched alongside the requested one and served, in this order, when it is missing
+CACHE_FALLBACK_RATES = ('high', 'medium', 'ultra')
+
+# Large cache objects are downloaded as concurrent ranged GETs of this size
+S3_RANGE_SIZE = 8 * 1024 * 1024
+S3_RANGE_WORKERS = 8
+
+
+def _get_client(service_name: str):
+    """Return a cached boto3 client for the given service"""
+    client = _clients.get(service_name)
+    if client is None:
+        config = CLIENT_CONFIG
+        if service_name in CLIENT_CONFIG_OVERRIDES:
+            config = config.merge(CLIENT_CONFIG_OVERRIDES[service_name])
+        client = _clients[service_name] = boto3.client(service_name, config=config)
+    return client
+
+
+def _get_lookup_executor() -> ThreadPoolExecutor:
+    """Return the threads that run concurrent Redis and S3 cache lookups"""
+    global _lookup_executor
+    if _lookup_executor is None:
+        _lookup_executor = ThreadPoolExecutor(max_workers=2)
+    return _lookup_executor
+
+
+def _get_redis():
+    """Return the pooled Redis client, or None when no cache endpoint is configured
+    
+    redis is imported on first use only, so containers without a cache endpoint never
+    load it; a missing package disables Redis instead of failing every lookup.
+    """
+    global _redis_client, _redis_missing
+    redis_endpoint = os.environ.get('REDIS_ENDPOINT')
+    if _redis_client is None and redis_endpoint and not _redis_missing:
+        try:
+            import redis
+        except ImportError:
+            _redis_missing = True
+            logger.warning("redis package not installed, Redis cache lookups disabled")
+            return None
+        
+        # An invocation issues one request at a time, so a small pool of kept-alive TLS
+        # connections covers it; idle connections are probed before ElastiCache drops them
+        _redis_client = redis.Redis(
+            connection_pool=redis.BlockingConnectionPool(
+                connection_class=redis.SSLConnection,
+                host=redis_endpoint,
+                port=int(os.environ.get('REDIS_PORT', 6379)),
+                max_connections=2,
+                socket_connect_timeout=2,
+                socket_keepalive=True,
+                socket_keepalive_options=REDIS_KEEPALIVE_OPTIONS,
+                health_check_interval=30,
+                decode_responses=False  # :data values are binary zstd frames
+            )
+        )
+    return _redis_client
+
+
+def _read_json_object(bucket: str, key: str) -> Any:
+    """Download and decode a JSON S3 object, inflating it when stored gzip-encoded
+    
+    The first part is fetched with a ranged GET that also reports the object size,
+    so small objects still cost a single request; the rest of a large object is
+    fetched as concurrent ranged GETs.
+    """
+    s3_client = _get_client('s3')
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{S3_RANGE_SIZE - 1}")
+    first_part = response['Body'].read()
+    size = int(response['ContentRange'].rsplit('/', 1)[1])
+    
+    if size <= len(first_part):
+        body = first_part
+    else:
+        buffer = bytearray(size)
+        buffer[:len(first_part)] = first_part
+        
+        def read_range(start: int) -> None:
+            end = min(start + S3_RANGE_SIZE, size) - 1
+            part = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+            buffer[start:end + 1] = part['Body'].read()
+        
+        starts = range(len(first_part), size, S3_RANGE_SIZE)
+        with ThreadPoolExecutor(max_workers=min(S3_RANGE_WORKERS, len(starts))) as executor:
+            list(executor.map(read_range, starts))
+        body = bytes(buffer)
+    
+    if response.get('ContentEncoding') == 'gzip':
+        body = gzip.decompress(body)
+    return orjson.loads(body)
+
+
+def _decode_redis_cache(metadata: bytes, data: bytes) -> Dict[str, Any]:
+    """Rebuild a cache document from its Redis :metadata and (zstd-compressed) :data values"""
+    if data.startswith(ZSTD_MAGIC):
+        data = zstd.ZstdDecompressor().decompress(data)
+    return {
+        'compressed_kv': data.decode('utf-8'),
+        'metadata': orjson.loads(metadata)
+    }
+
+
+# Build the clients during Lambda INIT rather than on the first request
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    _get_client('s3')
+    _get_client('bedrock-runtime')
+    _get_redis()
+
 
 @logger.inject_lambda_context(log_event=True)
 @tracer.capture_lambda_handler
@@ -25,9 +206,11 @@ metrics = Metrics(namespace="TAKC", service="query-processor")
 def lambda_handler(event: dict, context: LambdaContext):
     """AWS Lambda handler for API Gateway integration"""
     try:
-        # Parse request body
-        if isinstance(event.get('body'), str):
-            body = json.loads(event['body'])
+        # GET /query carries parameters in the query string (edge-cacheable), POST in the body
+        if event.get('httpMethod') == 'GET':
+            body = event.get('queryStringParameters') or {}
+        elif isinstance(event.get('body'), str):
+            body = orjson.loads(event['body'])
         else:
             body = event.get('body', {})
         
@@ -46,9 +229,9 @@ def lambda_handler(event: dict, context: LambdaContext):
             metrics.add_metric(name="ValidationErrors", unit=MetricUnit.Count, value=1)
             return {
                 'statusCode': 400,
-                'body': json.dumps({
+                'body': orjson.dumps({
                     'error': 'Missing required parameters: query and task_type'
-                })
+                }).decode()
             }
         
         # Process query
@@ -68,9 +251,11 @@ def lambda_handler(event: dict, context: LambdaContext):
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
+                'Access-Control-Allow-Origin': '*',
+                # Let CloudFront keep answers briefly; never cache a missing-cache or fallback-rate response
+                'Cache-Control': 'no-store' if _is_degraded(result) else f'max-age={QUERY_RESPONSE_MAX_AGE}'
             },
-            'body': json.dumps(result)
+            'body': orjson.dumps(result).decode()
         }
         
     except Exception as e:
@@ -78,12 +263,17 @@ def lambda_handler(event: dict, context: LambdaContext):
         metrics.add_metric(name="ProcessingErrors", unit=MetricUnit.Count, value=1)
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': orjson.dumps({
                 'error': str(e)
-            })
+            }).decode()
         }
 
 
+def _is_degraded(result: Dict[str, Any]) -> bool:
+    """Whether a query result must not be edge-cached (no cache, or another rate was served)"""
+    return 'error' in result or result.get('compression_rate_used') != result.get('compression_rate_requested')
+
+
 @tracer.capture_method
 def process_query(query: str, task_type: str, compression_rate: Optional[str] = None) -> Dict[str, Any]:
     """Process a query using TAKC with optimal compression rate"""
@@ -97,8 +287,8 @@ def process_query(query: str, task_type: str, compression_rate: Optional[str] =
             "compression_rate": compression_rate
         })
     
-    # Retrieve compressed cache
-    compressed_cache = _retrieve_compressed_cache(task_type, compression_rate)
+    # Retrieve compressed cache (possibly for a fallback rate when the requested one is missing)
+    compressed_cache, served_rate = _retrieve_compressed_cache(task_type, compression_rate)
     
     if not compressed_cache:
         logger.warning("Cache not found", extra={
@@ -110,6 +300,7 @@ def process_query(query: str, task_type: str, compression_rate: Optional[str] =
             'query': query,
             'response': f"No compressed cache found for task_type: {task_type}, rate: {compression_rate}. Please run compression service first.",
             'compression_rate_used': compression_rate,
+            'compression_rate_requested': compression_rate,
             'task_type': task_type,
             'error': 'cache_not_found'
         }
@@ -117,95 +308,134 @@ def process_query(query: str, task_type: str, compression_rate: Optional[str] =
     metrics.add_metric(name="CacheHits", unit=MetricUnit.Count, value=1)
     
     # Process query with compressed context
-    response = _generate_response(query, compressed_cache, compression_rate, task_type)
+    response = _generate_response(query, compressed_cache, served_rate, task_type)
     
     return {
         'query': query,
         'response': response,
-        'compression_rate_used': compression_rate,
+        'compression_rate_used': served_rate,
+        'compression_rate_requested': compression_rate,
         'task_type': task_type,
         'cache_info': compressed_cache.get('metadata', {})
     }
 
 
-def _analyze_query_complexity(query: str) -> str:
-    """Analyze query complexity"""
-    query_lower = query.lower()
-    
-    # Simple heuristics for query complexity
-    if any(word in query_lower for word in ['analyze', 'compare', 'evaluate', 'assess']):
-        return 'high'
-    elif any(word in query_lower for word in ['explain', 'describe', 'summarize']):
-        return 'medium'
-    else:
-        return 'low'
-
-
-def _recommend_compression_rate(task_type: str, data_size: int, query_complexity: str) -> str:
-    """Recommend compression rate based on task and query"""
-    if query_complexity == 'high':
-        return 'light'
-    elif query_complexity == 'medium':
-        return 'medium'
-    else:
-        return 'high'
-
-
 @tracer.capture_method
-def _retrieve_compressed_cache(task_type: str, compression_rate: str) -> Optional[Dict[str, Any]]:
-    """Retrieve compressed cache from Redis or S3"""
+def _retrieve_compressed_cache(task_type: str, compression_rate: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Retrieve compressed cache from Redis or S3, returning (cache, rate actually served)
+    
+    The same Redis round trip also fetches the fallback rates; one of those is served
+    only when the requested rate is in neither Redis nor S3. With
+    CACHE_PARALLEL_LOOKUP enabled, the S3 read starts alongside the Redis lookup
+    instead of after a Redis miss. Caches for the requested rate are also kept
+    in process for LOCAL_CACHE_TTL seconds.
+    """
+    cache_key = (task_type, compression_rate)
+    local_entry = _local_caches.get(cache_key)
+    if local_entry is not None and time.monotonic() - local_entry[0] < LOCAL_CACHE_TTL:
+        _local_caches.move_to_end(cache_key)
+        metrics.add_metric(name="InProcessCacheHits", unit=MetricUnit.Count, value=1)
+        return local_entry[1], compression_rate
+    
     try:
-        # Try Redis first
-        redis_endpoint = os.environ.get('REDIS_ENDPOINT')
-        redis_port = int(os.environ.get('REDIS_PORT', 6379))
-        
-        if redis_endpoint:
-            try:
-                import redis
-                r = redis.Redis(host=redis_endpoint, port=redis_port, decode_responses=True, socket_connect_timeout=2)
-                cache_key = f"takc:{task_type}:{compression_rate}"
-                cached_data = r.get(cache_key)
-                
-                if cached_data:
-                    logger.info("Cache retrieved from Redis", extra={"cache_key": cache_key})
-                    metrics.add_metric(name="RedisHits", unit=MetricUnit.Count, value=1)
-                    return json.loads(cached_data)
-            except Exception as e:
-                logger.warning("Redis connection failed, falling back to S3", extra={"error": str(e)})
-                metrics.add_metric(name="RedisMisses", unit=MetricUnit.Count, value=1)
+        if CACHE_PARALLEL_LOOKUP and _get_redis() is not None:
+            redis_future = _get_lookup_executor().submit(_lookup_redis_cache, task_type, compression_rate)
+            s3_future = _get_lookup_executor().submit(_lookup_s3_cache, task_type, compression_rate)
+            
+            # A Redis hit answers without waiting for S3; the S3 read is left to finish in the background
+            cache_data, fallback = redis_future.result()
+            if cache_data is None:
+                cache_data = s3_future.result()
+        else:
+            cache_data, fallback = _lookup_redis_cache(task_type, compression_rate)
+            if cache_data is None:
+                cache_data = _lookup_s3_cache(task_type, compression_rate)
         
-        # Fallback to S3
-        s3_client = boto3.client('s3')
-        bucket = os.environ.get('S3_BUCKET')
-        key = f"cache/v2/{task_type}/{compression_rate}/cache.json"
+        if cache_data is not None:
+            _local_caches[cache_key] = (time.monotonic(), cache_data)
+            _local_caches.move_to_end(cache_key)
+            while len(_local_caches) > LOCAL_CACHE_SIZE:
+                _local_caches.popitem(last=False)
+            return cache_data, compression_rate
         
-        try:
-            response = s3_client.get_object(Bucket=bucket, Key=key)
-            logger.info("Cache retrieved from S3", extra={"bucket": bucket, "key": key})
-            metrics.add_metric(name="S3Hits", unit=MetricUnit.Count, value=1)
-            return json.loads(response['Body'].read().decode('utf-8'))
-        except Exception as e:
-            logger.error("S3 retrieval failed", extra={"error": str(e), "bucket": bucket, "key": key})
-            metrics.add_metric(name="S3Misses", unit=MetricUnit.Count, value=1)
-            return None
+        # Degrade to another rate already fetched from Redis rather than fail the query
+        if fallback is not None:
+            fallback_rate, metadata, data = fallback
+            logger.warning("Serving fallback compression rate from Redis", extra={
+                "requested_rate": compression_rate,
+                "served_rate": fallback_rate
+            })
+            metrics.add_metric(name="RedisFallbackHits", unit=MetricUnit.Count, value=1)
+            return _decode_redis_cache(metadata, data), fallback_rate
+        return None, compression_rate
             
     except Exception as e:
         logger.exception("Cache retrieval error", extra={"error": str(e)})
+        return None, compression_rate
+
+
+def _lookup_redis_cache(task_type: str, compression_rate: str) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, bytes, bytes]]]:
+    """Look up the requested rate in Redis, returning (cache, first available fallback entry)"""
+    global _redis_retry_at
+    redis_client = _get_redis()
+    if redis_client is None or time.monotonic() < _redis_retry_at:
+        return None, None
+    
+    try:
+        rates = [compression_rate] + [rate for rate in CACHE_FALLBACK_RATES if rate != compression_rate]
+        # Pipelined GETs rather than MGET: the keys hash to different slots, which a
+        # cluster-mode (serverless) cache rejects for multi-key commands
+        pipe = redis_client.pipeline(transaction=False)
+        for rate in rates:
+            pipe.get(f"takc:{task_type}:{rate}:metadata")
+            pipe.get(f"takc:{task_type}:{rate}:data")
+        values = pipe.execute()
+        entries = [
+            (rate, metadata, data)
+            for rate, metadata, data in zip(rates, values[::2], values[1::2])
+            if metadata and data
+        ]
+        
+        if entries and entries[0][0] == compression_rate:
+            logger.info("Cache retrieved from Redis", extra={"cache_key": f"takc:{task_type}:{compression_rate}"})
+            metrics.add_metric(name="RedisHits", unit=MetricUnit.Count, value=1)
+            return _decode_redis_cache(entries[0][1], entries[0][2]), None
+        
+        metrics.add_metric(name="RedisMisses", unit=MetricUnit.Count, value=1)
+        return None, entries[0] if entries else None
+    except Exception as e:
+        # Skip Redis for a while so an unreachable cache does not add a connect timeout to every query
+        _redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        logger.warning("Redis connection failed, falling back to S3", extra={"error": str(e)})
+        metrics.add_metric(name="RedisMisses", unit=MetricUnit.Count, value=1)
+        return None, None
+
+
+def _lookup_s3_cache(task_type: str, compression_rate: str) -> Optional[Dict[str, Any]]:
+    """Read the requested rate's cache document from S3"""
+    bucket = os.environ.get('S3_BUCKET', 'takc-processed-data')
+    key = f"cache/v2/{task_type}/{compression_rate}/cache.json"
+    
+    try:
+        cache_data = _read_json_object(bucket, key)
+        logger.info("Cache retrieved from S3", extra={"bucket": bucket, "key": key})
+        metrics.add_metric(name="S3Hits", unit=MetricUnit.Count, value=1)
+        return cache_data
+    except Exception as e:
+        logger.error("S3 retrieval failed", extra={"error": str(e), "bucket": bucket, "key": key})
+        metrics.add_metric(name="S3Misses", unit=MetricUnit.Count, value=1)
         return None
 
 
+@lru_cache(maxsize=4096)
 def _analyze_query_complexity(query: str) -> str:
     """Analyze query complexity to determine appropriate compression rate"""
-    query_lower = query.lower()
-    
     # Simple queries - can use ultra compression
-    simple_keywords = ['what', 'when', 'who', 'total', 'sum', 'revenue', 'profit']
-    if any(keyword in query_lower for keyword in simple_keywords) and len(query.split()) < 10:
+    if _SIMPLE_QUERY_RE.search(query) and len(query.split()) < 10:
         return 'simple'
     
     # Complex queries - need lighter compression
-    complex_keywords = ['analyze', 'compare', 'explain', 'why', 'how', 'relationship', 'trend']
-    if any(keyword in query_lower for keyword in complex_keywords):
+    if _COMPLEX_QUERY_RE.search(query):
         return 'complex'
     
     return 'moderate'
@@ -221,21 +451,6 @@ def _select_compression_rate(complexity: str) -> str:
     return rate_map.get(complexity, 'high')
 
 
-def _retrieve_compressed_cache(task_type: str, compression_rate: str) -> Optional[Dict[str, Any]]:
-    """Retrieve compressed cache from S3"""
-    try:
-        s3_client = boto3.client('s3')
-        bucket_name = os.environ.get('S3_BUCKET', 'takc-processed-data')
-        key = f"cache/v2/{task_type}/{compression_rate}/cache.json"
-        
-        response = s3_client.get_object(Bucket=bucket_name, Key=key)
-        cache_data = json.loads(response['Body'].read().decode('utf-8'))
-        return cache_data
-    except Exception as e:
-        print(f"Error retrieving cache: {e}")
-        return None
-
-
 def _generate_response(query: str, compressed_cache: Dict[str, Any], 
                      compression_rate: str, task_type: str) -> str:
     """Generate response using Bedrock with compressed context"""
@@ -253,22 +468,15 @@ Compressed Knowledge:
 
 User Query: {query}
 
-Instructions:
-1. Answer the query using ONLY the information from the compressed knowledge above
-2. Be concise and specific
-3. If the information is not in the compressed knowledge, say "I don't have that information in the provided context"
-4. Do not make up information
-
-Answer:"""
+{_RESPONSE_INSTRUCTIONS}"""
     
     try:
         # Call Bedrock for inference
-        bedrock_runtime = boto3.client('bedrock-runtime')
-        model_id = os.environ.get('BEDROCK_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+        bedrock_runtime = _get_client('bedrock-runtime')
         
         response = bedrock_runtime.invoke_model(
-            modelId=model_id,
-            body=json.dumps({
+            modelId=BEDROCK_MODEL_ID,
+            body=orjson.dumps({
                 'anthropic_version': 'bedrock-2023-05-31',
                 'messages': [{
                     'role': 'user',
@@ -279,13 +487,13 @@ Answer:"""
             })
         )
         
-        result = json.loads(response['body'].read())
+        result = orjson.loads(response['body'].read())
         answer = result['content'][0]['text']
         
         logger.info("Bedrock response generated", extra={
             "query": query,
             "compression_rate": compression_rate,
-            "model_id": model_id
+            "model_id": BEDROCK_MODEL_ID
         })
         
         return answer
@@ -299,9 +507,9 @@ Answer:"""
 if __name__ == '__main__':
     # Test locally
     test_event = {
-        'body': json.dumps({
+        'body': orjson.dumps({
             'query': 'What was the total revenue?',
             'task_type': 'financial-analysis'
-        })
+        }).decode()
     }
-    print(json.dumps(lambda_handler(test_event, None), indent=2))
\ No newline at end of file
+    print(orjson.dumps(lambda_handler(test_event, None), option=orjson.OPT_INDENT_2).decode())
\ No newline at end of file
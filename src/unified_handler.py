@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Unified Lambda Entry Point for TAKC Ingestion
+Routes S3 upload events and direct compression requests to the existing handlers
+in-process, so data processing and compression share one function and one cold start.
+"""
+
+import json
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+import bedrock_compression_service
+import data_processor
+
+logger = Logger(service="unified-handler")
+
+
+def lambda_handler(event: dict, context: LambdaContext):
+    """Dispatch on event shape: S3 notification vs direct compression invoke"""
+    # S3 event notifications for raw-data uploads (directly or batched through SQS)
+    if 'Records' in event:
+        return data_processor.lambda_handler(event, context)
+
+    # Direct invocation to (re)compress already-chunked data
+    if event.get('mode') == 'compress' or 'chunks_location' in event:
+        return bedrock_compression_service.lambda_handler(event, context)
+
+    logger.warning("Unsupported event shape", extra={"event_keys": sorted(event.keys())})
+    return {
+        'statusCode': 400,
+        'body': json.dumps({'error': 'Unsupported event type'})
+    }
@@ -4,14 +4,14 @@ Unit tests for the compression service
 """
 
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock
 import sys
 import os
 
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from compression_service import CompressionService, CompressionConfig
+from compression_service import CompressionService, CompressionConfig, _count_tokens
 
 
 class TestCompressionService(unittest.TestCase):
@@ -101,12 +101,22 @@ class TestCompressionService(unittest.TestCase):
         # Check that compression actually happened
         self.assertLess(result['compressed_tokens'], result['original_tokens'])
 
-    @patch('boto3.client')
-    def test_store_compressed_cache(self, mock_boto3_client):
+    def test_compress_context_small_input(self):
+        """Test small contexts are returned without compression"""
+        config = CompressionConfig(compression_rate="ultra")
+        
+        result = self.service.compress_context("Revenue was $125 million.", config)
+        
+        self.assertEqual(result['compressed_kv'], "Revenue was $125 million.")
+        self.assertEqual(result['compressed_tokens'], result['original_tokens'])
+
+    def test_store_compressed_cache(self):
         """Test storing compressed cache"""
-        # Mock S3 client
+        # Inject mocked S3 and STS clients rather than patching the shared client cache
         mock_s3 = MagicMock()
-        mock_boto3_client.return_value = mock_s3
+        mock_sts = MagicMock()
+        mock_sts.get_caller_identity.return_value = {'Account': '123456789012'}
+        self.service = CompressionService(s3_client=mock_s3, sts_client=mock_sts)
         
         compressed_data = {
             'compressed_kv': 'Test compressed data',
@@ -129,5 +139,37 @@ class TestCompressionService(unittest.TestCase):
         mock_s3.put_object.assert_called_once()
 
 
+    def test_retrieve_compressed_cache_from_redis(self):
+        """Test a Redis hit reads :metadata and :data with pipelined GETs"""
+        mock_s3 = MagicMock()
+        self.service = CompressionService(s3_client=mock_s3, sts_client=MagicMock())
+        self.service.redis_client = MagicMock()
+        pipe = self.service.redis_client.pipeline.return_value
+        pipe.execute.return_value = [b'{"compression_rate": "medium"}', b"Cached context"]
+        
+        result = self.service.retrieve_compressed_cache("financial", "medium")
+        
+        self.assertEqual(result['compressed_kv'], "Cached context")
+        self.assertEqual(result['metadata'], {'compression_rate': "medium"})
+        self.service.redis_client.pipeline.assert_called_once_with(transaction=False)
+        self.service.redis_client.mget.assert_not_called()
+        mock_s3.get_object.assert_not_called()
+
+    def test_count_tokens(self):
+        """Test block-wise token counting matches len(text.split())"""
+        samples = [
+            "",
+            "   \n\t ",
+            "  leading and trailing  ",
+            "revenue grew\n\n15% year-over-year",
+            self.test_context
+        ]
+        # Small blocks put block boundaries inside words, between words and inside whitespace runs
+        for text in samples:
+            for block_size in (1, 2, 3, 7, len(text) or 1):
+                with self.subTest(text=text[:20], block_size=block_size):
+                    self.assertEqual(_count_tokens(text, block_size), len(text.split()))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
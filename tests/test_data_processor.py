@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the data processing pipeline
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+import json
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import data_processor
+from data_processor import DataProcessor
+
+LAMBDA_CONTEXT = SimpleNamespace(
+    function_name="takc-data-processor",
+    memory_limit_in_mb=2048,
+    invoked_function_arn="arn:aws:lambda:us-east-1:123456789012:function:takc-data-processor",
+    aws_request_id="test-request"
+)
+
+
+def s3_record(key, bucket="takc-raw-data"):
+    """S3 event notification record for an uploaded object"""
+    return {'eventSource': 'aws:s3', 's3': {'bucket': {'name': bucket}, 'object': {'key': key}}}
+
+
+def sqs_record(body):
+    """SQS record carrying an S3 notification (or any other message body)"""
+    return {'eventSource': 'aws:sqs', 'body': json.dumps(body)}
+
+
+def reference_chunks(data, chunk_size, overlap=0):
+    """Chunking by slicing the full word list, the behaviour chunk_data must preserve"""
+    words = data.split()
+    return [' '.join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size - overlap)]
+
+
+class TestChunkData(unittest.TestCase):
+    """Test cases for word-window chunking"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.processor = DataProcessor()
+
+    def test_matches_word_slicing(self):
+        """Test chunks match slicing the split word list, including irregular whitespace"""
+        words = [f"word{i}" for i in range(23)]
+        separators = [" ", "\n", "  ", "\t", " \r\n "]
+        data = "  " + ''.join(word + separators[i % len(separators)] for i, word in enumerate(words))
+
+        for chunk_size, overlap in ((5, 2), (5, 0), (4, 3), (23, 5), (30, 10), (1, 0)):
+            with self.subTest(chunk_size=chunk_size, overlap=overlap):
+                self.assertEqual(
+                    self.processor.chunk_data(data, chunk_size, overlap),
+                    reference_chunks(data, chunk_size, overlap)
+                )
+
+    def test_empty_input(self):
+        """Test empty and whitespace-only data produce no chunks"""
+        self.assertEqual(self.processor.chunk_data("", 5, 2), [])
+        self.assertEqual(self.processor.chunk_data(" \n\t ", 5, 2), [])
+
+    def test_input_shorter_than_one_chunk(self):
+        """Test data shorter than a chunk yields a single normalized chunk"""
+        self.assertEqual(self.processor.chunk_data(" Revenue  grew\n15% ", 256, 50), ["Revenue grew 15%"])
+
+    def test_no_overlap(self):
+        """Test overlap=0 partitions the words into consecutive chunks"""
+        self.assertEqual(
+            self.processor.chunk_data("a b c d e f g", 3, 0),
+            ["a b c", "d e f", "g"]
+        )
+
+
+class TestDataProcessorHandler(unittest.TestCase):
+    """Test cases for S3/SQS event routing in the data processor handler"""
+
+    def setUp(self):
+        """Route the handler to a processor with a mocked S3 client and compression handler"""
+        self.processor = DataProcessor()
+        self.processor.s3_client = MagicMock()
+        self.processor.s3_client.download_fileobj.side_effect = (
+            lambda bucket, key, buffer, Config=None: buffer.write(f"contents of {key}".encode('utf-8'))
+        )
+
+        processor_patcher = patch.object(data_processor, '_processor', self.processor)
+        processor_patcher.start()
+        self.addCleanup(processor_patcher.stop)
+
+        compression_patcher = patch.object(data_processor, 'compression_handler', return_value={'statusCode': 200})
+        self.compression_handler = compression_patcher.start()
+        self.addCleanup(compression_patcher.stop)
+
+    def test_extract_s3_records(self):
+        """Test direct S3 records pass through and SQS bodies are unwrapped"""
+        direct = s3_record("raw-data/financial/a.txt")
+        wrapped = s3_record("raw-data/legal/b.txt")
+        event = {'Records': [
+            direct,
+            sqs_record({'Records': [wrapped]}),
+            sqs_record({'Service': 'Amazon S3', 'Event': 's3:TestEvent'})
+        ]}
+
+        self.assertEqual(data_processor._extract_s3_records(event), [direct, wrapped])
+
+    def test_sqs_test_event_is_ignored(self):
+        """Test an s3:TestEvent message succeeds without processing anything"""
+        event = {'Records': [sqs_record({'Service': 'Amazon S3', 'Event': 's3:TestEvent'})]}
+
+        result = data_processor.lambda_handler(event, LAMBDA_CONTEXT)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.processor.s3_client.put_object.assert_not_called()
+        self.compression_handler.assert_not_called()
+
+    def test_batch_compresses_once_per_task_type(self):
+        """Test a batch stores chunks per file but compresses each task type once"""
+        event = {'Records': [
+            sqs_record({'Records': [s3_record("raw-data/financial/a.txt"), s3_record("raw-data/financial/b.txt")]}),
+            sqs_record({'Records': [s3_record("raw-data/legal/c.txt")]})
+        ]}
+
+        result = data_processor.lambda_handler(event, LAMBDA_CONTEXT)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(self.processor.s3_client.download_fileobj.call_count, 3)
+        self.assertEqual(self.processor.s3_client.put_object.call_count, 3)
+        compressed_task_types = [call[0][0]['task_type'] for call in self.compression_handler.call_args_list]
+        self.assertEqual(compressed_task_types, ["financial", "legal"])
+
+    def test_failed_compression_fails_sqs_batch(self):
+        """Test a non-200 compression result raises so SQS retries the batch"""
+        self.compression_handler.return_value = {'statusCode': 500}
+        event = {'Records': [sqs_record({'Records': [s3_record("raw-data/financial/a.txt")]})]}
+
+        with self.assertRaises(RuntimeError):
+            data_processor.lambda_handler(event, LAMBDA_CONTEXT)
+
+    def test_failed_compression_direct_invoke(self):
+        """Test a non-200 compression result is reported as a 500 for direct S3 events"""
+        self.compression_handler.return_value = {'statusCode': 500}
+        event = {'Records': [s3_record("raw-data/financial/a.txt")]}
+
+        result = data_processor.lambda_handler(event, LAMBDA_CONTEXT)
+
+        self.assertEqual(result['statusCode'], 500)
+
+    def test_read_failure_reraised_on_sqs_path(self):
+        """Test processing errors propagate for SQS batches and become a 500 otherwise"""
+        self.processor.s3_client.download_fileobj.side_effect = Exception("Access denied")
+        record = s3_record("raw-data/financial/a.txt")
+
+        with self.assertRaises(Exception):
+            data_processor.lambda_handler({'Records': [sqs_record({'Records': [record]})]}, LAMBDA_CONTEXT)
+
+        result = data_processor.lambda_handler({'Records': [record]}, LAMBDA_CONTEXT)
+        self.assertEqual(result['statusCode'], 500)
+        self.compression_handler.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the query processor
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+import gzip
+import io
+import re
+import sys
+import os
+
+import orjson
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import query_processor
+
+
+class TestQueryProcessor(unittest.TestCase):
+    """Test cases for query processing and cache retrieval"""
+
+    def setUp(self):
+        """Start every test with empty in-process state and no Redis backoff"""
+        query_processor._local_caches.clear()
+        query_processor._redis_retry_at = 0.0
+        self.redis = MagicMock()
+        redis_patcher = patch.object(query_processor, '_get_redis', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def _redis_values(self, **rates):
+        """Pipelined GET results for the requested rate plus the fallback rates, in lookup order"""
+        requested = next(iter(rates))
+        order = [requested] + [rate for rate in query_processor.CACHE_FALLBACK_RATES if rate != requested]
+        values = []
+        for rate in order:
+            text = rates.get(rate)
+            if text is None:
+                values += [None, None]
+            else:
+                values += [orjson.dumps({'compression_rate': rate}), text.encode('utf-8')]
+        return values
+
+    @patch.object(query_processor, '_lookup_s3_cache', return_value=None)
+    def test_fallback_rate_is_reported(self, mock_s3):
+        """Test a fallback-rate hit reports the rate actually served"""
+        self.redis.pipeline.return_value.execute.return_value = self._redis_values(ultra=None, high="high context")
+
+        cache, served_rate = query_processor._retrieve_compressed_cache("financial", "ultra")
+
+        self.assertEqual(served_rate, "high")
+        self.assertEqual(cache['compressed_kv'], "high context")
+
+        with patch.object(query_processor, '_generate_response', return_value="answer") as mock_generate:
+            result = query_processor.process_query("What was revenue?", "financial", "ultra")
+
+        self.assertEqual(result['compression_rate_used'], "high")
+        self.assertEqual(result['compression_rate_requested'], "ultra")
+        self.assertEqual(mock_generate.call_args[0][2], "high")
+        self.assertTrue(query_processor._is_degraded(result))
+
+    def test_requested_rate_is_cacheable(self):
+        """Test a hit for the requested rate is reported as served and edge-cacheable"""
+        self.redis.pipeline.return_value.execute.return_value = self._redis_values(ultra="ultra context")
+
+        with patch.object(query_processor, '_generate_response', return_value="answer"):
+            result = query_processor.process_query("What was revenue?", "financial", "ultra")
+
+        self.assertEqual(result['compression_rate_used'], "ultra")
+        self.assertFalse(query_processor._is_degraded(result))
+        # Keys span hash slots, so they are read with pipelined GETs rather than one MGET
+        self.redis.pipeline.assert_called_once_with(transaction=False)
+        self.redis.mget.assert_not_called()
+
+    @patch.object(query_processor.time, 'monotonic')
+    def test_local_cache_expires_after_ttl(self, mock_monotonic):
+        """Test a cached document is served in process until LOCAL_CACHE_TTL elapses"""
+        self.redis.pipeline.return_value.execute.return_value = self._redis_values(ultra="ultra context")
+        mock_monotonic.return_value = 1000.0
+        query_processor._retrieve_compressed_cache("financial", "ultra")
+
+        mock_monotonic.return_value = 1000.0 + query_processor.LOCAL_CACHE_TTL - 1
+        cache, _ = query_processor._retrieve_compressed_cache("financial", "ultra")
+        self.assertEqual(cache['compressed_kv'], "ultra context")
+        self.assertEqual(self.redis.pipeline.return_value.execute.call_count, 1)
+
+        mock_monotonic.return_value = 1000.0 + query_processor.LOCAL_CACHE_TTL
+        query_processor._retrieve_compressed_cache("financial", "ultra")
+        self.assertEqual(self.redis.pipeline.return_value.execute.call_count, 2)
+
+    def test_local_cache_evicts_least_recently_used(self):
+        """Test the in-process cache keeps at most LOCAL_CACHE_SIZE documents, dropping the oldest"""
+        self.redis.pipeline.return_value.execute.return_value = self._redis_values(ultra="ultra context")
+        task_types = [f"task{i}" for i in range(query_processor.LOCAL_CACHE_SIZE + 1)]
+
+        for task_type in task_types[:-1]:
+            query_processor._retrieve_compressed_cache(task_type, "ultra")
+        # Touch the oldest entry so the second one becomes least recently used
+        query_processor._retrieve_compressed_cache(task_types[0], "ultra")
+        query_processor._retrieve_compressed_cache(task_types[-1], "ultra")
+
+        self.assertEqual(len(query_processor._local_caches), query_processor.LOCAL_CACHE_SIZE)
+        self.assertIn((task_types[0], "ultra"), query_processor._local_caches)
+        self.assertNotIn((task_types[1], "ultra"), query_processor._local_caches)
+
+    @patch.object(query_processor, '_lookup_s3_cache', return_value=None)
+    def test_fallback_rate_not_cached_locally(self, mock_s3):
+        """Test a fallback-rate document is not stored under the requested rate"""
+        self.redis.pipeline.return_value.execute.return_value = self._redis_values(ultra=None, high="high context")
+
+        query_processor._retrieve_compressed_cache("financial", "ultra")
+        query_processor._retrieve_compressed_cache("financial", "ultra")
+
+        self.assertNotIn(("financial", "ultra"), query_processor._local_caches)
+        self.assertEqual(self.redis.pipeline.return_value.execute.call_count, 2)
+
+
+    def test_query_complexity_matches_inflected_terms(self):
+        """Test complexity keywords match inflected forms but not words that merely contain them"""
+        for query in ("Which trends stand out?", "Margins compared to last year",
+                      "Describe the relationships between segments", "This explains the drop"):
+            with self.subTest(query=query):
+                self.assertEqual(query_processor._analyze_query_complexity(query), 'complex')
+
+        self.assertEqual(query_processor._analyze_query_complexity("Show the quarterly figures"), 'moderate')
+        self.assertEqual(query_processor._analyze_query_complexity("What was revenue?"), 'simple')
+
+
+class FakeRangedS3:
+    """S3 client stand-in that serves ranged GETs of one object"""
+
+    def __init__(self, body, content_encoding=None):
+        self.body = body
+        self.content_encoding = content_encoding
+        self.ranges = []
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = map(int, re.fullmatch(r'bytes=(\d+)-(\d+)', Range).groups())
+        self.ranges.append((start, end))
+        part = self.body[start:end + 1]
+        response = {
+            'Body': io.BytesIO(part),
+            'ContentRange': f"bytes {start}-{start + len(part) - 1}/{len(self.body)}"
+        }
+        if self.content_encoding:
+            response['ContentEncoding'] = self.content_encoding
+        return response
+
+
+@patch.object(query_processor, 'S3_RANGE_SIZE', 16)
+class TestReadJsonObject(unittest.TestCase):
+    """Test cases for reassembling S3 objects from concurrent ranged GETs"""
+
+    def _read(self, body, content_encoding=None):
+        s3 = FakeRangedS3(body, content_encoding)
+        with patch.object(query_processor, '_get_client', return_value=s3):
+            return query_processor._read_json_object("bucket", "cache.json"), s3.ranges
+
+    @staticmethod
+    def _json_document(size):
+        """A JSON string literal exactly size bytes long"""
+        return b'"' + bytes(ord('a') + i % 26 for i in range(size - 2)) + b'"'
+
+    def test_reassembles_objects_around_range_boundaries(self):
+        """Test objects smaller than, equal to, a multiple of, and just past the range size"""
+        for size in (5, 16, 48, 49):
+            with self.subTest(size=size):
+                body = self._json_document(size)
+
+                document, ranges = self._read(body)
+
+                self.assertEqual(document, body[1:-1].decode('ascii'))
+                self.assertEqual(len(ranges), -(-size // 16))
+                self.assertEqual(max(end for _, end in ranges), max(size, 16) - 1)
+
+    def test_gzip_encoded_object(self):
+        """Test a gzip-encoded object is inflated after reassembly"""
+        document = {'compressed_kv': "x" * 200, 'metadata': {'compression_rate': "high"}}
+        body = gzip.compress(orjson.dumps(document))
+
+        result, ranges = self._read(body, content_encoding='gzip')
+
+        self.assertEqual(result, document)
+        self.assertGreater(len(ranges), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the unified ingestion entry point
+"""
+
+import unittest
+from unittest.mock import patch, sentinel
+import json
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unified_handler
+
+
+@patch('bedrock_compression_service.lambda_handler', return_value={'statusCode': 200, 'handler': 'compress'})
+@patch('data_processor.lambda_handler', return_value={'statusCode': 200, 'handler': 'ingest'})
+class TestUnifiedHandler(unittest.TestCase):
+    """Test cases for routing events to the ingestion and compression handlers"""
+
+    def test_s3_records_route_to_data_processor(self, mock_ingest, mock_compress):
+        """Test S3 and SQS record events are handled by the data processor"""
+        event = {'Records': [{'eventSource': 'aws:sqs', 'body': '{}'}]}
+
+        result = unified_handler.lambda_handler(event, sentinel.context)
+
+        self.assertEqual(result['handler'], 'ingest')
+        mock_ingest.assert_called_once_with(event, sentinel.context)
+        mock_compress.assert_not_called()
+
+    def test_compress_mode_routes_to_compression(self, mock_ingest, mock_compress):
+        """Test mode=compress and chunks_location events are handled by the compression service"""
+        for event in ({'mode': 'compress', 'task_type': 'financial'},
+                      {'task_type': 'financial', 'chunks_location': 's3://bucket/financial/'}):
+            mock_compress.reset_mock()
+
+            result = unified_handler.lambda_handler(event, sentinel.context)
+
+            self.assertEqual(result['handler'], 'compress')
+            mock_compress.assert_called_once_with(event, sentinel.context)
+        mock_ingest.assert_not_called()
+
+    def test_unsupported_event(self, mock_ingest, mock_compress):
+        """Test other event shapes are rejected with a 400"""
+        result = unified_handler.lambda_handler({'task_type': 'financial'}, sentinel.context)
+
+        self.assertEqual(result['statusCode'], 400)
+        self.assertEqual(json.loads(result['body']), {'error': 'Unsupported event type'})
+        mock_ingest.assert_not_called()
+        mock_compress.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()